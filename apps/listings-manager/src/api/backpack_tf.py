@@ -1,14 +1,22 @@
 from utils.rate_limiter import SmartRateLimiter
 from database.listings import ListingsDatabase
+from database.summaries import SummariesDatabase
 from utils.logger import SyncLogger
 from utils.config import BPTF_TOKEN
-from utils.utils import *
+from utils.translation import translation
+from utils.normalization import normalize_listing
+from utils.pricing import get_price
+from utils.single_flight import SingleFlight
 import aiohttp
 import asyncio
 import random
 import time
 
 
+# Snapshot fetches in flight, shared by every instance so the API and the updater never fetch an item twice at once.
+snapshot_fetches = SingleFlight()
+
+
 class BackpackTFAPI:
 
     def __init__(self) -> None:
@@ -22,6 +30,7 @@ class BackpackTFAPI:
         self.logger = SyncLogger("BackpackTFAPI")
         self.rate_limiter = SmartRateLimiter()
         self.db = ListingsDatabase()
+        self.summaries_db = SummariesDatabase()
 
 
     async def call(self, url: str, params: dict) -> dict:
@@ -106,75 +115,22 @@ class BackpackTFAPI:
         raise Exception("Failed to fetch snapshots after multiple attempts")
 
 
-    async def format_listing(self, listing: dict) -> dict:
+    async def format_listing(self, listing: dict, sku: str = None, name: str = None) -> dict:
         """
         Format the listing.
         
         Args:
             listing (dict): Listing data.
+            sku (str): SKU of the item.
+            name (str): Name of the item.
             
         Returns:
             dict: Formatted listing.
         """
         try:
-            currencies = listing["currencies"]
-
-            # Skip Marketplace.tf listings
-            if "usd" in currencies:
-                return
-
-            intent = listing["intent"]
-            steamID = listing["steamid"]
-            listing_id = listing["item"]["id"] if intent == "sell" else f"buy_440_{steamID}"
-
-            data = {
-                "_id": listing_id,
-                "bumpAt": listing["bump"],
-                "buyoutOnly": bool(listing.get("buyout", False)),
-                "currencies": currencies,
-                "details": listing["details"],
-                "intent": intent,
-                "listedAt": listing["timestamp"],
-                "steamID": steamID,
-                "tradeOffersPreferred": bool(listing.get("offers", False)),
-            }
-
-            if listing.get("userAgent"):
-                data["userAgent"] = listing["userAgent"]
-
-            if listing["item"].get("attributes"):
-                attributes = listing["item"]["attributes"]
-                for attr in attributes:
-                    defindex = int(attr.get("defindex"))
-                    float_value = attr.get("float_value", None)
-
-                    if float_value:
-                        try:
-                            float_value = int(float_value)
-                        except ValueError:
-                            float_value = float(float_value) if float_value else None
-                    else:
-                        float_value = None
-
-                    if 1004 <= defindex <= 1009:
-                        # Spells
-                        if not data.get("spells"): data["spells"] = []
-                        if not float_value: float_value = 1
-                        data["spells"].append({"defindex": defindex, "id": float_value, "name": spells_attributes[defindex][float_value]})
-                    elif defindex == 142:
-                        # Paint
-                        data["paint"] = {"id": float_value, "name": paints_attributes[float_value]}
-                    elif defindex in [380, 382, 384]:
-                        # Strange Parts
-                        if not data.get("strangeParts"): data["strangeParts"] = []
-                        data["strangeParts"].append({"id": float_value, "name": strange_parts_attributes[float_value]})
-                    elif defindex == 2013:
-                        # Killstreak effect
-                        data["killstreaker"] = {"id": float_value, "name": killstreak_effects_attributes[float_value]}
-                    elif defindex == 2014:
-                        # Killstreak sheen
-                        data["sheen"] = {"id": float_value, "name": killstreak_sheens_attributes[float_value]}
-
+            data = normalize_listing(listing, sku, name)
+            if data:
+                data["price"] = get_price(data["currencies"])
             return data
         except Exception as e:
             self.logger.write_log("error", f"Failed to format listing ({listing}): {e}")
@@ -182,7 +138,20 @@ class BackpackTFAPI:
 
     async def get_listings(self, sku: str) -> list:
         """
-        Get listings from the Backpack.tf API.
+        Get listings from the Backpack.tf API, joining the fetch already in flight for the item if there is one.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            list: List of formatted listings.
+        """
+        return await snapshot_fetches.run(sku, self.fetch_listings, sku)
+
+
+    async def fetch_listings(self, sku: str) -> list:
+        """
+        Fetch listings from the Backpack.tf API and reconcile them with the stored listings.
         
         Args:
             sku (str): SKU of the item.
@@ -193,7 +162,7 @@ class BackpackTFAPI:
             if "None" in sku:
                 raise Exception("Invalid item SKU")
 
-            item_name = tf2.get_name_from_sku(sku)
+            item_name = translation.get_name_from_sku(sku)
             if not item_name:
                 raise Exception("Invalid item name")
 
@@ -206,19 +175,18 @@ class BackpackTFAPI:
                 raise Exception("No active listings found")
             
             formatted_listings = []
-            listing_ids = []
+            listing_ids = set()
             for listing in listings:
-                formatted_listing = await self.format_listing(listing)
+                formatted_listing = await self.format_listing(listing, sku, item_name)
                 if formatted_listing:
-                    formatted_listing["sku"] = sku
-                    formatted_listing["name"] = item_name
-
                     if formatted_listing["_id"] not in listing_ids:
                         formatted_listings.append(formatted_listing)
-                        listing_ids.append(formatted_listing["_id"])
+                        listing_ids.add(formatted_listing["_id"])
 
-            await self.db.delete_all(sku)
-            await self.db.insert(sku, formatted_listings)
+            await self.db.add_watched_item(sku)
+            changes = await self.db.reconcile(sku, formatted_listings)
+            self.logger.write_log("info", f"Reconciled listings for {sku}: {changes}")
+            await self.summaries_db.update(sku)
 
             return formatted_listings
         except Exception as e:
@@ -1,11 +1,38 @@
-from utils.config import DATABASE_URL
+from utils.config import DATABASE_URL, LISTINGS_LAYOUT
+from pymongo import ReplaceOne, DeleteMany
 from utils.logger import SyncLogger
 import motor.motor_asyncio
+import time
+import orjson
+import zlib
 
 
 client = motor.motor_asyncio.AsyncIOMotorClient(DATABASE_URL)
 
 
+# Name of the collection holding every listing with the unified layout.
+UNIFIED_COLLECTION = "listings"
+
+
+def get_unified_id(sku: str, listing_id: str) -> str:
+    """
+    Get the ID of a listing in the unified collection. Buy listing IDs are only
+    unique per item, so the SKU is part of the ID.
+
+    Args:
+        sku (str): SKU of the item.
+        listing_id (str): ID of the listing.
+
+    Returns:
+        str: ID of the listing document.
+    """
+    return f"{sku}|{listing_id}"
+
+
+# Per-SKU collections whose price index was created by this process.
+indexed_skus = set()
+
+
 class ListingsDatabase:
 
     def __init__(self) -> None:
@@ -15,6 +42,72 @@ class ListingsDatabase:
         self.db = client["backpacktf_listings"]
         self.logger = SyncLogger("ListingsDatabase")
 
+        # With the unified layout, listings of all items share one collection instead of one collection per SKU
+        self.unified = LISTINGS_LAYOUT == "unified"
+        self.listings = self.db[UNIFIED_COLLECTION]
+
+        # With the unified layout, watched items are recorded here, as an item without listings leaves no trace in the listings collection
+        self.watched_items = client["backpacktf_items"]["items"]
+
+
+    def get_collection(self, sku: str) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        """
+        Get the collection holding an item's listings.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            AsyncIOMotorCollection: Collection of the listings.
+        """
+        return self.listings if self.unified else self.db[sku]
+
+
+    def get_filter(self, sku: str, listing_id: str = None) -> dict:
+        """
+        Get the query matching an item's listings, or one of them.
+
+        Args:
+            sku (str): SKU of the item.
+            listing_id (str): ID of the listing, or None for all of the item's listings.
+
+        Returns:
+            dict: Query filter.
+        """
+        if listing_id is not None:
+            return {"_id": get_unified_id(sku, listing_id) if self.unified else listing_id}
+        return {"sku": sku} if self.unified else {}
+
+
+    def get_document(self, sku: str, listing: dict) -> dict:
+        """
+        Get the stored document of a listing.
+
+        Args:
+            sku (str): SKU of the item.
+            listing (dict): Listing data.
+
+        Returns:
+            dict: Listing document.
+        """
+        if not self.unified:
+            return listing
+        return {**listing, "_id": get_unified_id(sku, listing["_id"]), "sku": sku}
+
+
+    async def create_indexes(self) -> None:
+        """
+        Create the indexes of the unified listings collection.
+        """
+        if not self.unified:
+            return
+
+        try:
+            await self.listings.create_index([("sku", 1), ("intent", 1), ("price", 1)])
+            await self.listings.create_index("steamID")
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to create indexes: {e}")
+
 
     async def get_collections(self) -> list:
         """
@@ -24,11 +117,48 @@ class ListingsDatabase:
             list: List of collections.
         """
         try:
-            return await self.db.list_collection_names()
+            if self.unified:
+                # Items with listings are included for data written before watched items were recorded
+                watched = await self.watched_items.distinct("_id")
+                return list(set(watched) | set(await self.listings.distinct("sku")))
+
+            collections = await self.db.list_collection_names()
+            return [name for name in collections if name != UNIFIED_COLLECTION]
         except Exception as e:
             self.logger.write_log("error", f"Failed to get collections: {e}")
 
 
+    async def add_watched_item(self, sku: str) -> None:
+        """
+        Record an item as watched, so it stays known with the unified layout once it has no listings.
+
+        Args:
+            sku (str): SKU of the item.
+        """
+        try:
+            if self.unified:
+                await self.watched_items.update_one({"_id": sku}, {"$setOnInsert": {"addedAt": time.time()}}, upsert=True)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to add watched item: {e}")
+
+
+    async def get(self, sku: str) -> list:
+        """
+        Get listings from the database.
+        
+        Args:
+            sku (str): SKU of the item.
+            
+        Returns:
+            list: List of listings.
+        """
+        try:
+            cursor = self.get_collection(sku).find(self.get_filter(sku), {"_id": False})
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to get listings: {e}")
+
+
     async def insert(self, sku: str, listings: list) -> None:
         """
         Insert listings into the database.
@@ -38,7 +168,7 @@ class ListingsDatabase:
             listings (list): List of listings.
         """
         try:
-            await self.db[sku].insert_many(listings)
+            await self.get_collection(sku).insert_many([self.get_document(sku, listing) for listing in listings])
         except Exception as e:
             self.logger.write_log("error", f"Failed to insert listings: {e}")
 
@@ -51,6 +181,87 @@ class ListingsDatabase:
             sku (str): SKU of the item.
         """
         try:
-            await self.db[sku].delete_many({})
+            await self.get_collection(sku).delete_many(self.get_filter(sku))
         except Exception as e:
             self.logger.write_log("error", f"Failed to delete all listings: {e}")
+
+
+    def get_hash(self, document: dict) -> int:
+        """
+        Get the content hash of a listing document.
+
+        Args:
+            document (dict): Listing document.
+
+        Returns:
+            int: Content hash.
+        """
+        return zlib.crc32(orjson.dumps(document, option=orjson.OPT_SORT_KEYS))
+
+
+    async def create_price_index(self, sku: str) -> None:
+        """
+        Create the price index of an item's collection, once per process. With the
+        unified layout, the compound index of the listings collection covers it.
+
+        Args:
+            sku (str): SKU of the item.
+        """
+        if self.unified or sku in indexed_skus:
+            return
+
+        try:
+            await self.db[sku].create_index([("intent", 1), ("price", 1)])
+            indexed_skus.add(sku)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to create price index for {sku}: {e}")
+
+
+    async def reconcile(self, sku: str, listings: list) -> dict:
+        """
+        Make the stored listings of an item match a snapshot, writing only the listings
+        that were added, changed or removed, in a single batch.
+
+        Args:
+            sku (str): SKU of the item.
+            listings (list): List of listings in the snapshot.
+
+        Returns:
+            dict: Number of inserted, updated, deleted and unchanged listings.
+        """
+        summary = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        collection = self.get_collection(sku)
+        await self.create_price_index(sku)
+
+        try:
+            stored_hashes = {}
+            async for document in collection.find(self.get_filter(sku)):
+                stored_hashes[document["_id"]] = self.get_hash(document)
+
+            requests = []
+            snapshot_ids = set()
+            for listing in listings:
+                document = self.get_document(sku, listing)
+                snapshot_ids.add(document["_id"])
+
+                stored_hash = stored_hashes.get(document["_id"])
+                if stored_hash is None:
+                    summary["inserted"] += 1
+                elif stored_hash != self.get_hash(document):
+                    summary["updated"] += 1
+                else:
+                    summary["unchanged"] += 1
+                    continue
+                requests.append(ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+
+            removed_ids = [listing_id for listing_id in stored_hashes if listing_id not in snapshot_ids]
+            if removed_ids:
+                requests.append(DeleteMany({"_id": {"$in": removed_ids}}))
+                summary["deleted"] = len(removed_ids)
+
+            if requests:
+                await collection.bulk_write(requests, ordered=False)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to reconcile listings: {e}")
+
+        return summary
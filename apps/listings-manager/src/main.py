@@ -2,8 +2,10 @@ from tasks.listings_updater import ListingsUpdater
 from api.ws_manager import WebsocketManager
 from fastapi import FastAPI, HTTPException
 from contextlib import asynccontextmanager
-from api.backpack_tf import BackpackTFAPI
+from api.backpack_tf import BackpackTFAPI, snapshot_fetches
+from utils.translation import translation
 from utils.logger import SyncLogger
+from utils.pricing import KeyPriceService
 import asyncio
 
 
@@ -11,6 +13,7 @@ logger = SyncLogger("ListingsManagerAPI")
 listings_updater = ListingsUpdater()
 ws_manager = WebsocketManager()
 bptf = BackpackTFAPI()
+key_prices = KeyPriceService()
 
 
 @asynccontextmanager
@@ -22,7 +25,11 @@ async def lifespan(app: FastAPI):
         app (FastAPI): FastAPI application.
     """
     logger.write_log("info", "Starting API server lifespan")
+    await listings_updater.listings_db.create_indexes()
+    await key_prices.refresh()
+    asyncio.create_task(key_prices.run())
     asyncio.create_task(listings_updater.run())
+    asyncio.create_task(listings_updater.run_priority())
     yield
     logger.write_log("info", "Stopping API server lifespan")
 
@@ -44,6 +51,21 @@ async def health_check() -> dict:
     except Exception as e:
         logger.write_log("error", f"Failed to perform health check: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+@app.get("/stats")
+async def get_stats() -> dict:
+    """
+    Get service statistics.
+
+    Returns:
+        dict: Translation cache and snapshot fetch statistics.
+    """
+    try:
+        return {"translation": translation.get_stats(), "snapshots": snapshot_fetches.get_stats()}
+    except Exception as e:
+        logger.write_log("error", f"Failed to get stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
         
 
 @app.get("/listings")
@@ -69,3 +91,28 @@ async def get_listings(item_sku: str) -> list:
     except Exception as e:
         logger.write_log("error", f"Failed to get listings: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+@app.post("/refresh")
+async def refresh_items(data: dict) -> dict:
+    """
+    Refresh items ahead of the regular update cycle.
+
+    Args:
+        data (dict): Input data containing the SKUs of the items, most urgent first.
+
+    Returns:
+        dict: A response indicating the result of the operation.
+    """
+    try:
+        skus = data.get("skus")
+        if not isinstance(skus, list):
+            raise HTTPException(status_code=400, detail="List of SKUs is required.")
+
+        listings_updater.prioritize_items(skus)
+        return {"success": True, "message": f"Scheduled {len(skus)} items for refresh."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.write_log("error", f"Failed to schedule items refresh: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
@@ -17,6 +17,64 @@ class ListingsUpdater:
         self.ws_manager = WebsocketManager()
         self.bptf = BackpackTFAPI()
 
+        # Items to refresh ahead of the regular cycle, in order of urgency
+        self.priority_items = {}
+        self.priority_available = asyncio.Event()
+
+
+    async def update_item(self, sku: str) -> None:
+        """
+        Update the listings of an item from a fresh snapshot.
+
+        Args:
+            sku (str): SKU of the item.
+        """
+        try:
+            listings = await self.bptf.get_listings(sku)
+            if not listings:
+                raise Exception("No available listings found")
+            
+            await self.ws_manager.remove_updates_from_queue(sku)
+
+            item_name = listings[0]["name"]
+            self.logger.write_log("info", f"Successfully updated listings for {item_name} ({sku})")
+
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to update listings for {sku}: {e}")
+
+
+    def prioritize_items(self, skus: list) -> None:
+        """
+        Schedule items to be refreshed ahead of the regular update cycle.
+
+        Args:
+            skus (list): SKUs of the items, most urgent first.
+        """
+        for sku in skus:
+            self.priority_items.setdefault(sku, None)
+        if self.priority_items:
+            self.priority_available.set()
+        self.logger.write_log("info", f"Scheduled {len(skus)} items for priority refresh, {len(self.priority_items)} pending")
+
+
+    async def run_priority(self) -> None:
+        """
+        Run the priority refresh process, updating scheduled items as soon as they are requested.
+        """
+        while True:
+            try:
+                while not self.priority_items:
+                    self.priority_available.clear()
+                    await self.priority_available.wait()
+
+                sku = next(iter(self.priority_items))
+                del self.priority_items[sku]
+                await self.update_item(sku)
+                await asyncio.sleep(0.5)
+            except Exception as e:
+                self.logger.write_log("error", f"Critical error during the priority refresh process: {e}")
+                await asyncio.sleep(1)
+
 
     async def run(self) -> None:
         """
@@ -37,19 +95,7 @@ class ListingsUpdater:
 
                 self.logger.write_log("info", f"Starting listings update process for {len(collections)} items")
                 for sku in collections:
-                    try:
-                        listings = await self.bptf.get_listings(sku)
-                        if not listings:
-                            raise Exception("No available listings found")
-                        
-                        await self.ws_manager.remove_updates_from_queue(sku)
-
-                        item_name = listings[0]["name"]
-                        self.logger.write_log("info", f"Successfully updated listings for {item_name} ({sku})")
-
-                    except Exception as e:
-                        self.logger.write_log("error", f"Failed to update listings for {sku}: {e}")
-
+                    await self.update_item(sku)
                     await asyncio.sleep(sleep_time)
                 
                 self.logger.write_log("info", "All listings updated successfully")
@@ -0,0 +1,91 @@
+from database.listings import client, get_unified_id, UNIFIED_COLLECTION
+from pymongo import ReplaceOne, DeleteMany
+from utils.logger import SyncLogger
+import argparse
+import asyncio
+import time
+
+
+class ListingsMigration:
+
+    def __init__(self, batch_size: int = 1000) -> None:
+        """
+        Initialize the ListingsMigration class.
+
+        Copies listings from the per-SKU collections into the unified listings collection,
+        and records every item as watched.
+        The copy of each item is a sync, so it can run while the services still write to
+        the per-SKU collections and be repeated until the switch to the unified layout.
+
+        Args:
+            batch_size (int): Number of listings written per batch (default is 1000).
+        """
+        self.logger = SyncLogger("ListingsMigration")
+        self.db = client["backpacktf_listings"]
+        self.listings = self.db[UNIFIED_COLLECTION]
+        self.watched_items = client["backpacktf_items"]["items"]
+        self.batch_size = batch_size
+
+
+    async def sync_item(self, sku: str) -> int:
+        """
+        Copy the listings of an item into the unified collection, removing listings no longer in its collection.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            int: Number of listings copied.
+        """
+        copied_ids = []
+        requests = []
+        async for listing in self.db[sku].find({}):
+            listing_id = get_unified_id(sku, listing["_id"])
+            copied_ids.append(listing_id)
+            requests.append(ReplaceOne({"_id": listing_id}, {**listing, "_id": listing_id, "sku": sku}, upsert=True))
+            if len(requests) >= self.batch_size:
+                await self.listings.bulk_write(requests, ordered=False)
+                requests = []
+
+        # Listings deleted from the item's collection since an earlier pass
+        requests.append(DeleteMany({"sku": sku, "_id": {"$nin": copied_ids}}))
+        await self.listings.bulk_write(requests, ordered=False)
+        return len(copied_ids)
+
+
+    async def run(self, drop_source: bool = False) -> None:
+        """
+        Copy every per-SKU collection into the unified collection.
+
+        Args:
+            drop_source (bool): Whether to drop each per-SKU collection once it was copied.
+        """
+        await self.listings.create_index([("sku", 1), ("intent", 1), ("price", 1)])
+        await self.listings.create_index("steamID")
+
+        collections = [name for name in await self.db.list_collection_names() if name != UNIFIED_COLLECTION]
+        self.logger.write_log("info", f"Migrating {len(collections)} items to the {UNIFIED_COLLECTION} collection")
+
+        copied = 0
+        for index, sku in enumerate(collections, start=1):
+            try:
+                copied += await self.sync_item(sku)
+                await self.watched_items.update_one({"_id": sku}, {"$setOnInsert": {"addedAt": time.time()}}, upsert=True)
+                if drop_source:
+                    await self.db.drop_collection(sku)
+            except Exception as e:
+                self.logger.write_log("error", f"Failed to migrate listings for {sku}: {e}")
+
+            if index % 100 == 0:
+                self.logger.write_log("info", f"Migrated {index} of {len(collections)} items")
+
+        self.logger.write_log("info", f"Migrated {copied} listings of {len(collections)} items")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy per-SKU listings collections into the unified listings collection.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Number of listings written per batch")
+    parser.add_argument("--drop-source", action="store_true", help="Drop each per-SKU collection once it was copied")
+    args = parser.parse_args()
+
+    asyncio.run(ListingsMigration(args.batch_size).run(args.drop_source))
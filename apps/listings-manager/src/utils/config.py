@@ -7,3 +7,6 @@ STEAM_API_KEY = os.getenv("STEAM_API_KEY")
 WS_MANAGER_URL = os.getenv("WS_MANAGER_URL")
 BPTF_TOKEN = [token.strip() for token in list(os.getenv("BPTF_TOKEN", "").split(","))]
 DATABASE_URL = os.getenv("DATABASE_URL")
+LISTINGS_LAYOUT = os.getenv("LISTINGS_LAYOUT", "collections").lower()
+KEY_PRICE = float(os.getenv("KEY_PRICE", 60))
+SUMMARY_DEPTH = int(os.getenv("SUMMARY_DEPTH", 5))
@@ -0,0 +1,108 @@
+from database.listings import ListingsDatabase
+from utils.config import KEY_PRICE
+from utils.logger import SyncLogger
+import statistics
+import asyncio
+import time
+
+
+# SKU of the Mann Co. Supply Crate Key, whose listings set the key price.
+KEY_SKU = "5021;6"
+
+# Price of a key in refined metal, used to express every listing price in refined metal.
+key_price = {"value": KEY_PRICE, "last_update": 0}
+
+
+def get_price(currencies: dict) -> float:
+    """
+    Get the value of a listing's currencies in refined metal.
+
+    Args:
+        currencies (dict): Keys and metal of the listing.
+
+    Returns:
+        float: Value in refined metal.
+    """
+    return round(float(currencies.get("keys", 0) or 0) * key_price["value"] + float(currencies.get("metal", 0) or 0), 2)
+
+
+class KeyPriceService:
+
+    def __init__(self) -> None:
+        """
+        Initialize the KeyPriceService class.
+        """
+        self.logger = SyncLogger("KeyPriceService")
+        self.db = ListingsDatabase()
+        self.refresh_interval = 300
+
+
+    def get_best_price(self, prices: list) -> float:
+        """
+        Get the best price of a side of the market.
+
+        Args:
+            prices (list): Prices, best first.
+
+        Returns:
+            float: Median of the three best prices, the best price if there are fewer, or None if there are none.
+        """
+        if len(prices) >= 3:
+            return statistics.median(prices[:3])
+        return prices[0] if prices else None
+
+
+    def get_key_price(self, listings: list) -> float:
+        """
+        Get the key price from the key's own metal-only listings: the midpoint of the
+        best buy and sell prices, each taken as the median of the three best listings
+        when there are enough of them, so a single outlier does not move it.
+
+        Args:
+            listings (list): Listings of the key.
+
+        Returns:
+            float: Key price in refined metal, rounded to a scrap, or None if there are no metal-only listings.
+        """
+        prices = {"buy": [], "sell": []}
+        for listing in listings:
+            currencies = listing.get("currencies", {})
+            if currencies.get("keys") or not currencies.get("metal"):
+                continue
+            prices.setdefault(listing.get("intent"), []).append(float(currencies["metal"]))
+
+        best_buy = self.get_best_price(sorted(prices["buy"], reverse=True))
+        best_sell = self.get_best_price(sorted(prices["sell"]))
+        if best_buy and best_sell:
+            price = (best_buy + best_sell) / 2
+        else:
+            price = best_buy or best_sell
+        return round(price * 9) / 9 if price else None
+
+
+    async def refresh(self) -> None:
+        """
+        Refresh the key price from the key's stored listings.
+        """
+        try:
+            listings = await self.db.get(KEY_SKU)
+            price = self.get_key_price(listings or [])
+            if not price:
+                self.logger.write_log("warning", f"No key listings to price keys from, keeping {key_price['value']:.2f} ref")
+                return
+
+            if price != key_price["value"]:
+                self.logger.write_log("info", f"Key price changed from {key_price['value']:.2f} to {price:.2f} ref")
+            key_price["value"] = price
+            key_price["last_update"] = time.time()
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to refresh key price: {e}")
+
+
+    async def run(self) -> None:
+        """
+        Refresh the key price periodically.
+        """
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,62 @@
+import asyncio
+
+
+class SingleFlight:
+
+    def __init__(self) -> None:
+        """
+        Initialize the SingleFlight class.
+
+        Concurrent calls for the same key share one in-flight call, and all of them get its result.
+        """
+        self.calls = {}
+        self.stats = {"started": 0, "shared": 0}
+
+
+    def is_running(self, key: str) -> bool:
+        """
+        Check if a call is in flight for a key.
+
+        Args:
+            key (str): Key of the call.
+
+        Returns:
+            bool: True if a call is in flight, False otherwise.
+        """
+        return key in self.calls
+
+
+    async def run(self, key: str, function, *args):
+        """
+        Run a coroutine function, or join the call already in flight for the key.
+
+        The shared call is shielded, so a caller that is cancelled does not cancel it for the others.
+
+        Args:
+            key (str): Key of the call.
+            function: Coroutine function to call.
+            *args: Arguments of the function.
+
+        Returns:
+            Result of the call.
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function(*args))
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.calls.pop(key) if self.calls.get(key) is done else None)
+            self.stats["started"] += 1
+        else:
+            self.stats["shared"] += 1
+
+        return await asyncio.shield(task)
+
+
+    def get_stats(self) -> dict:
+        """
+        Get single-flight statistics.
+
+        Returns:
+            dict: Number of calls in flight, started and shared.
+        """
+        return {"in_flight": len(self.calls), **self.stats}
@@ -0,0 +1,121 @@
+from utils.utils import tf2_client
+from collections import OrderedDict
+import threading
+
+
+class TranslationCache:
+
+    def __init__(self, max_size: int = 50000) -> None:
+        """
+        Initialize the TranslationCache class.
+
+        Args:
+            max_size (int): Maximum number of entries kept per lookup (default is 50000).
+        """
+        self.max_size = max_size
+        self.schema = None
+        self.lock = threading.Lock()
+        self.caches = {"name": OrderedDict(), "sku": OrderedDict(), "valid": OrderedDict()}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+    def lookup(self, kind: str, key: str, resolve) -> object:
+        """
+        Look up a translation, resolving and caching it on a miss.
+        Negative results, including lookups that raise, are cached as None.
+
+        Args:
+            kind (str): Name of the lookup ("name", "sku" or "valid").
+            key (str): SKU or name to translate.
+            resolve (callable): Function resolving the key against the current schema.
+
+        Returns:
+            object: The translated value.
+        """
+        schema = tf2_client.schema
+        with self.lock:
+            if schema is not self.schema:
+                # The schema auto-updated, so every cached translation may be stale
+                for cache in self.caches.values():
+                    cache.clear()
+                if self.schema is not None:
+                    self.stats["invalidations"] += 1
+                self.schema = schema
+
+            cache = self.caches[kind]
+            if key in cache:
+                cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return cache[key]
+            self.stats["misses"] += 1
+
+        try:
+            value = resolve(schema, key)
+        except Exception:
+            value = None
+
+        with self.lock:
+            if schema is self.schema:
+                cache[key] = value
+                if len(cache) > self.max_size:
+                    cache.popitem(last=False)
+
+        return value
+
+
+    def get_name_from_sku(self, sku: str) -> str:
+        """
+        Get the name of an item from its SKU.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            str: Name of the item, or None if the SKU is invalid.
+        """
+        return self.lookup("name", sku, lambda schema, key: schema.get_name_from_sku(key))
+
+
+    def get_sku_from_name(self, name: str) -> str:
+        """
+        Get the SKU of an item from its name.
+
+        Args:
+            name (str): Name of the item.
+
+        Returns:
+            str: SKU of the item, or None if the name is invalid.
+        """
+        return self.lookup("sku", name, lambda schema, key: schema.get_sku_from_name(key))
+
+
+    def test_sku(self, sku: str) -> bool:
+        """
+        Check if a SKU is valid.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            bool: True if the SKU is valid, False otherwise.
+        """
+        return bool(self.lookup("valid", sku, lambda schema, key: schema.test_sku(key)))
+
+
+    def get_stats(self) -> dict:
+        """
+        Get translation cache statistics.
+
+        Returns:
+            dict: Schema version, cache sizes, hits, misses, hit rate and invalidations.
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "schema_version": self.schema.time if self.schema is not None else None,
+            "sizes": {kind: len(cache) for kind, cache in self.caches.items()},
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0,
+            **self.stats,
+        }
+
+
+translation = TranslationCache()
@@ -1,8 +1,13 @@
 from utils.config import LISTINGS_MANAGER_URL
 from utils.logger import SyncLogger
+from utils.single_flight import SingleFlight
 import aiohttp
 
 
+# Listings manager fetches in flight, so concurrent requests for a new item share one snapshot fetch.
+listings_fetches = SingleFlight()
+
+
 class ListingsManager:
 
     def __init__(self) -> None:
@@ -15,7 +20,20 @@ class ListingsManager:
 
     async def get_listings(self, sku: str) -> list:
         """
-        Get item listings from the listings manager.
+        Get item listings from the listings manager, joining the fetch already in flight for the item if there is one.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            list: List of item listings.
+        """
+        return await listings_fetches.run(sku, self.fetch_listings, sku)
+
+
+    async def fetch_listings(self, sku: str) -> list:
+        """
+        Fetch item listings from the listings manager.
         
         Args:
             sku (str): SKU of the item.
@@ -13,17 +13,53 @@ class WebsocketManager:
         self.logger = SyncLogger("WebsocketManager")
 
 
-    async def get_item_updates(self) -> list:
+    async def get_item_updates(self, since: int = None) -> dict:
         """
         Get item updates from the websocket manager.
+
+        Args:
+            since (int): Last sequence number seen. If omitted, only the current sequence number is returned.
         
         Returns:
-            list: List of item updates.
+            dict: Feed ID, current sequence number, whether older updates were already dropped and the list of item updates.
         """
         try:
+            params = {"since": since} if since is not None else {}
             async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.url}/item-updates", timeout=10) as response:
+                async with session.get(f"{self.url}/item-updates", params=params, timeout=10) as response:
                     response.raise_for_status()
                     return await response.json()
         except Exception as e:
             self.logger.write_log("error", f"Failed to get item updates: {e}")
+
+
+    async def remove_item_from_cache(self, sku: str) -> None:
+        """
+        Remove an item from the websocket manager's item cache.
+        
+        Args:
+            sku (str): SKU of the item.
+        """
+        try:
+            data = {"item_sku": sku}
+            async with aiohttp.ClientSession() as session:
+                async with session.delete(f"{self.url}/item", json=data, timeout=10) as response:
+                    response.raise_for_status()
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to remove item from the cache: {e}")
+
+
+    async def report_demand(self, counts: dict) -> None:
+        """
+        Report item request counts to the websocket manager.
+        
+        Args:
+            counts (dict): Number of requests since the last report, by item SKU.
+        """
+        try:
+            data = {"counts": counts}
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{self.url}/demand", json=data, timeout=10) as response:
+                    response.raise_for_status()
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to report demand: {e}")
@@ -1,11 +1,90 @@
-from utils.config import DATABASE_URL
+from utils.config import DATABASE_URL, LISTINGS_LAYOUT
 from utils.logger import SyncLogger
 import motor.motor_asyncio
+import asyncio
+import base64
+import json
+import re
 
 
 client = motor.motor_asyncio.AsyncIOMotorClient(DATABASE_URL)
 
 
+# Name of the collection holding every listing with the unified layout.
+UNIFIED_COLLECTION = "listings"
+
+
+def get_unified_id(sku: str, listing_id: str) -> str:
+    """
+    Get the ID of a listing in the unified collection. Buy listing IDs are only
+    unique per item, so the SKU is part of the ID.
+
+    Args:
+        sku (str): SKU of the item.
+        listing_id (str): ID of the listing.
+
+    Returns:
+        str: ID of the listing document.
+    """
+    return f"{sku}|{listing_id}"
+
+
+# Fields that can be requested in a projection.
+field_pattern = re.compile(r"^[A-Za-z][\w.]*$")
+
+
+def encode_cursor(document: dict, sort: str) -> str:
+    """
+    Encode the position after a listing into a pagination cursor.
+
+    Args:
+        document (dict): Last listing of a page, with its ID and price.
+        sort (str): Price sort order of the page, or None.
+
+    Returns:
+        str: Pagination cursor.
+    """
+    position = [document.get("price"), document["_id"]] if sort else [document["_id"]]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: str) -> dict:
+    """
+    Decode a pagination cursor into the query matching the listings after it.
+
+    Prices are sorted with the listing ID as a tie breaker. Listings without a
+    price sort before all others in ascending order and after them in descending order.
+
+    Args:
+        cursor (str): Pagination cursor.
+        sort (str): Price sort order, or None.
+
+    Returns:
+        dict: Query filter.
+
+    Raises:
+        ValueError: If the cursor is not a valid cursor for the sort order.
+    """
+    position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(position, list) or len(position) != (2 if sort else 1) or not isinstance(position[-1], str):
+        raise ValueError("Invalid cursor")
+    if not sort:
+        return {"_id": {"$gt": position[-1]}}
+
+    price, listing_id = position
+    if price is not None and not isinstance(price, (int, float)):
+        raise ValueError("Invalid cursor")
+    after = "$gt" if sort == "asc" else "$lt"
+    if price is None:
+        without_price = {"price": None, "_id": {after: listing_id}}
+        return {"$or": [without_price, {"price": {"$ne": None}}]} if sort == "asc" else without_price
+
+    later = [{"price": {after: price}}, {"price": price, "_id": {after: listing_id}}]
+    if sort == "desc":
+        later.append({"price": None})
+    return {"$or": later}
+
+
 class ListingsDatabase:
 
     def __init__(self) -> None:
@@ -15,6 +94,42 @@ class ListingsDatabase:
         self.db = client["backpacktf_listings"]
         self.logger = SyncLogger("ListingsDatabase")
 
+        # With the unified layout, listings of all items share one collection instead of one collection per SKU
+        self.unified = LISTINGS_LAYOUT == "unified"
+        self.listings = self.db[UNIFIED_COLLECTION]
+
+        # With the unified layout, watched items are recorded here, as an item without listings leaves no trace in the listings collection
+        self.watched_items = client["backpacktf_items"]["items"]
+
+
+    def get_collection(self, sku: str) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        """
+        Get the collection holding an item's listings.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            AsyncIOMotorCollection: Collection of the listings.
+        """
+        return self.listings if self.unified else self.db[sku]
+
+
+    def get_filter(self, sku: str, listing_id: str = None) -> dict:
+        """
+        Get the query matching an item's listings, or one of them.
+
+        Args:
+            sku (str): SKU of the item.
+            listing_id (str): ID of the listing, or None for all of the item's listings.
+
+        Returns:
+            dict: Query filter.
+        """
+        if listing_id is not None:
+            return {"_id": get_unified_id(sku, listing_id) if self.unified else listing_id}
+        return {"sku": sku} if self.unified else {}
+
 
     async def get_collections(self) -> list:
         """
@@ -24,7 +139,13 @@ class ListingsDatabase:
             list: List of collections.
         """
         try:
-            return await self.db.list_collection_names()
+            if self.unified:
+                # Items with listings are included for data written before watched items were recorded
+                watched = await self.watched_items.distinct("_id")
+                return list(set(watched) | set(await self.listings.distinct("sku")))
+
+            collections = await self.db.list_collection_names()
+            return [name for name in collections if name != UNIFIED_COLLECTION]
         except Exception as e:
             self.logger.write_log("error", f"Failed to get collections: {e}")
 
@@ -40,20 +161,102 @@ class ListingsDatabase:
             list: List of listings.
         """
         try:
-            cursor = self.db[sku].find({}, {"_id": False})
+            cursor = self.get_collection(sku).find(self.get_filter(sku), {"_id": False})
             return await cursor.to_list(length=None)
         except Exception as e:
             self.logger.write_log("error", f"Failed to get listings: {e}")
 
 
+    async def get_many(self, skus: list) -> dict:
+        """
+        Get the listings of several items, with a single query in the unified layout.
+
+        Args:
+            skus (list): SKUs of the items.
+
+        Returns:
+            dict: List of listings, by SKU.
+        """
+        try:
+            if not self.unified:
+                results = await asyncio.gather(*(self.get(sku) for sku in skus))
+                return {sku: listings or [] for sku, listings in zip(skus, results)}
+
+            listings_by_sku = {sku: [] for sku in skus}
+            async for listing in self.listings.find({"sku": {"$in": skus}}, {"_id": False}):
+                listings_by_sku[listing["sku"]].append(listing)
+            return listings_by_sku
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to get listings: {e}")
+
+
     async def delete_all(self, sku: str) -> None:
         """
-        Delete all listings from the database.
+        Delete all listings from the database, and stop watching the item.
         
         Args:
             sku (str): SKU of the item.
         """
         try:
-            await self.db[sku].delete_many({})
+            await self.get_collection(sku).delete_many(self.get_filter(sku))
+            if self.unified:
+                await self.watched_items.delete_one({"_id": sku})
         except Exception as e:
             self.logger.write_log("error", f"Failed to delete all listings: {e}")
+
+
+    async def find(self, sku: str, intent: str = None, attributes: dict = None, sort: str = None, limit: int = None, cursor: str = None, fields: list = None) -> tuple:
+        """
+        Find an item's listings, filtering, sorting and paginating in the database.
+
+        Args:
+            sku (str): SKU of the item.
+            intent (str): Only return "buy" or "sell" listings, if given.
+            attributes (dict): Attribute names, or IDs for paints and killstreakers, the listings must have, by field ("paint", "spells", "killstreaker").
+            sort (str): Price sort order, "asc" or "desc", if given.
+            limit (int): Maximum number of listings, if given.
+            cursor (str): Cursor of the page to return, from a previous call.
+            fields (list): Fields to return, or None for all.
+
+        Returns:
+            tuple: List of listings and the cursor of the next page, or None if there are no more listings.
+        """
+        query = self.get_filter(sku)
+        if intent:
+            query["intent"] = intent
+        for field, value in (attributes or {}).items():
+            # Spell IDs are only unique within their category, so spells are matched by name
+            if value.isdigit() and field != "spells":
+                query[f"{field}.id"] = int(value)
+            else:
+                query[f"{field}.name"] = value
+        if cursor:
+            query = {"$and": [query, decode_cursor(cursor, sort)]}
+
+        projection = None
+        if fields:
+            projection = {field: True for field in fields if field_pattern.match(field)}
+            if sort:
+                projection["price"] = True
+
+        order = -1 if sort == "desc" else 1
+        sort_keys = [("price", order), ("_id", order)] if sort else [("_id", 1)]
+
+        find_cursor = self.get_collection(sku).find(query, projection).sort(sort_keys)
+        if limit:
+            # One more listing than asked tells whether there is a next page
+            find_cursor = find_cursor.limit(limit + 1)
+        listings = await find_cursor.to_list(length=None)
+
+        next_cursor = None
+        if limit and len(listings) > limit:
+            listings = listings[:limit]
+            next_cursor = encode_cursor(listings[-1], sort)
+
+        requested_fields = set(fields or ())
+        for listing in listings:
+            del listing["_id"]
+            if fields and "price" not in requested_fields:
+                listing.pop("price", None)
+
+        return listings, next_cursor
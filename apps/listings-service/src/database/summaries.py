@@ -0,0 +1,91 @@
+from database.listings import client, ListingsDatabase
+from utils.config import SUMMARY_DEPTH
+from utils.logger import SyncLogger
+import time
+
+
+# Fields of the best listings kept in a summary.
+summary_fields = {"_id": False, "steamID": True, "price": True, "currencies": True, "bumpAt": True}
+
+
+class SummariesDatabase:
+
+    def __init__(self) -> None:
+        """
+        Initialize the order book summaries database.
+
+        Summaries are written by the websocket and listings managers, and built here
+        for stored items that do not have one yet.
+        """
+        self.collection = client["backpacktf_summaries"]["summaries"]
+        self.listings_db = ListingsDatabase()
+        self.depth = SUMMARY_DEPTH
+        self.logger = SyncLogger("SummariesDatabase")
+
+
+    async def get_side(self, sku: str, intent: str) -> dict:
+        """
+        Summarize one side of an item's order book, using the price index.
+
+        Args:
+            sku (str): SKU of the item.
+            intent (str): "buy" or "sell".
+
+        Returns:
+            dict: Number of listings, best price and best listings.
+        """
+        collection = self.listings_db.get_collection(sku)
+        query = {**self.listings_db.get_filter(sku), "intent": intent}
+        order = -1 if intent == "buy" else 1
+
+        count = await collection.count_documents(query)
+        cursor = collection.find({**query, "price": {"$ne": None}}, summary_fields).sort([("price", order)]).limit(self.depth)
+        best_listings = await cursor.to_list(length=None)
+        return {"count": count, "best": best_listings[0]["price"] if best_listings else None, "listings": best_listings}
+
+
+    async def update(self, sku: str) -> None:
+        """
+        Rebuild the order book summary of an item.
+
+        Args:
+            sku (str): SKU of the item.
+        """
+        try:
+            buy = await self.get_side(sku, "buy")
+            sell = await self.get_side(sku, "sell")
+            spread = round(sell["best"] - buy["best"], 2) if buy["best"] is not None and sell["best"] is not None else None
+
+            summary = {"sku": sku, "buy": buy, "sell": sell, "spread": spread, "updatedAt": time.time()}
+            await self.collection.replace_one({"_id": sku}, summary, upsert=True)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to update summary for {sku}: {e}")
+
+
+    async def get(self, sku: str) -> dict:
+        """
+        Get the order book summary of an item.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            dict: Order book summary, or None if there is none.
+        """
+        try:
+            return await self.collection.find_one({"_id": sku}, {"_id": False})
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to get summary: {e}")
+
+
+    async def delete(self, sku: str) -> None:
+        """
+        Delete the order book summary of an item.
+
+        Args:
+            sku (str): SKU of the item.
+        """
+        try:
+            await self.collection.delete_one({"_id": sku})
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to delete summary: {e}")
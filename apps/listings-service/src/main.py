@@ -1,15 +1,20 @@
-from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
-from api.listings_manager import ListingsManager
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from api.listings_manager import ListingsManager, listings_fetches
 from database.listings import ListingsDatabase
 from api.ws_manager import WebsocketManager
 from contextlib import asynccontextmanager  
 from utils.token import AuthorizationToken
 from database.users import UsersDatabase
-from utils.config import SAVE_USER_DATA
+from database.summaries import SummariesDatabase
+from utils.config import SAVE_USER_DATA, NEW_ITEM_FETCH_LIMIT
 from utils.cache import CacheService
+from utils.listings_cache import ListingsCache
+from utils.responses import encode_body, encoded_response
 from utils.logger import SyncLogger
-from utils.utils import tf2
+from utils.translation import translation
 import asyncio
+import orjson
 import json
 
 
@@ -19,7 +24,18 @@ auth_token = AuthorizationToken()
 listings_db = ListingsDatabase()
 ws_manager = WebsocketManager()
 users_db = UsersDatabase()
+summaries_db = SummariesDatabase()
 cache = CacheService()
+listings_cache = ListingsCache()
+
+# Requests per item since the last demand report to the websocket manager.
+demand_counts = {}
+
+# Maximum number of SKUs in a batch listings request.
+MAX_BATCH_SKUS = 1000
+
+# Fetches of new items for batch requests in flight at once, shared by all batch requests so they cannot flood backpack.tf.
+new_item_fetches = asyncio.Semaphore(NEW_ITEM_FETCH_LIMIT)
 
 
 @asynccontextmanager
@@ -35,13 +51,71 @@ async def lifespan(app: FastAPI):
         await users_db.drop_database()
         logger.write_log("info", "Saving user data is disabled, dropped the users database")
 
+    broadcast_task = asyncio.create_task(broadcast_item_updates())
+    demand_task = asyncio.create_task(report_demand())
     yield
+    broadcast_task.cancel()
+    demand_task.cancel()
     logger.write_log("info", "Stopping API server lifespan")
 
 
 app = FastAPI(lifespan=lifespan)
 
 
+async def is_stored_item(sku: str) -> bool:
+    """
+    Check if an item's listings are stored. An item whose first fetch is still in
+    flight is not, so concurrent requests join that fetch instead of reading an
+    empty collection.
+
+    Args:
+        sku (str): SKU of the item.
+
+    Returns:
+        bool: True if the item's listings are stored, False otherwise.
+    """
+    return not listings_fetches.is_running(sku) and await cache.check_item_exists(sku)
+
+
+async def get_cached_listings(sku: str) -> dict:
+    """
+    Get an item's encoded listings from the in-memory listings cache, reading them from the database on a miss.
+
+    Args:
+        sku (str): SKU of the item.
+
+    Returns:
+        dict: Encoded listings from encode_body, or None if the item has no listings.
+    """
+    encoded = listings_cache.get(sku)
+    if encoded is None:
+        version = listings_cache.get_version(sku)
+        listings = await listings_db.get(sku)
+        if not listings:
+            return None
+
+        encoded = encode_body(listings)
+        listings_cache.put(sku, encoded, version)
+    return encoded
+
+
+async def report_demand() -> None:
+    """
+    Periodically report item request counts to the websocket manager, so updates of requested items are written first.
+    """
+    while True:
+        await asyncio.sleep(10)
+        try:
+            if not demand_counts:
+                continue
+
+            counts = demand_counts.copy()
+            demand_counts.clear()
+            await ws_manager.report_demand(counts)
+        except Exception as e:
+            logger.write_log("error", f"Failed to report demand: {e}")
+
+
 @app.get("/health")
 async def health_check() -> dict:
     """
@@ -56,43 +130,327 @@ async def health_check() -> dict:
     except Exception as e:
         logger.write_log("error", f"Failed to perform health check: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+@app.get("/stats")
+async def get_stats(request: Request) -> dict:
+    """
+    Get service statistics.
+
+    Args:
+        request (Request): Request object.
+
+    Returns:
+        dict: Translation and listings cache statistics, and listings manager fetch statistics.
+    """
+    try:
+        token = request.headers.get("Authorization", "")
+        if not auth_token.token_valid(token):
+            raise HTTPException(status_code=401, detail="Unauthorized.")
+
+        return {"translation": translation.get_stats(), "listings_cache": listings_cache.get_stats(), "listings_fetches": listings_fetches.get_stats()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.write_log("error", f"Failed to get stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
         
 
 @app.get("/listings")
-async def get_listings(request: Request, sku: str) -> list:
+async def get_listings(
+    request: Request,
+    sku: str,
+    intent: str = None,
+    sort: str = None,
+    limit: int = None,
+    cursor: str = None,
+    fields: str = None,
+    paint: str = None,
+    spell: str = None,
+    killstreaker: str = None,
+    ) -> Response:
     """
     Get listings for a specific item.
+
+    Filtering, sorting and pagination are done by the database. When a page is
+    cut short by the limit, the cursor of the next page is returned in the
+    X-Next-Cursor header. Responses carry an ETag, and a request with a matching
+    If-None-Match header gets an empty 304 response.
     
     Args:
         request (Request): Request object.
         sku (str): SKU of the item.
+        intent (str): Only return "buy" or "sell" listings.
+        sort (str): Sort by price, "asc" or "desc".
+        limit (int): Maximum number of listings to return, up to 1000.
+        cursor (str): Cursor of the page to return, from the X-Next-Cursor header of the previous page.
+        fields (str): Comma-separated fields to return.
+        paint (str): Only return listings with this paint, by name or ID.
+        spell (str): Only return listings with this spell, by name.
+        killstreaker (str): Only return listings with this killstreaker, by name or ID.
         
     Returns:
-        list: List of listings.
+        Response: JSON list of listings.
     """
     try:
         token = request.headers.get("Authorization", "")
         if not auth_token.token_valid(token):
             raise HTTPException(status_code=401, detail="Unauthorized.")
 
-        if not tf2.test_sku(sku):
+        if not translation.test_sku(sku):
             raise HTTPException(status_code=400, detail="Invalid SKU.")
+
+        if intent not in (None, "buy", "sell"):
+            raise HTTPException(status_code=400, detail="Intent must be buy or sell.")
+        if sort not in (None, "asc", "desc"):
+            raise HTTPException(status_code=400, detail="Sort must be asc or desc.")
+        if limit is not None and not 1 <= limit <= 1000:
+            raise HTTPException(status_code=400, detail="Limit must be between 1 and 1000.")
+
+        attributes = {field: value for field, value in (("paint", paint), ("spells", spell), ("killstreaker", killstreaker)) if value}
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        query_options = intent or sort or limit or cursor or field_list or attributes
         
-        if await cache.check_item_exists(sku):
-            listings = await listings_db.get(sku)
+        demand_counts[sku] = demand_counts.get(sku, 0) + 1
+
+        if await is_stored_item(sku):
+            encoded = await get_cached_listings(sku) if not query_options else None
         else:
             cache.add_item(sku)
             listings = await listings_manager.get_listings(sku)
-
-        if not listings:
+            if not listings:
+                raise HTTPException(status_code=404, detail="Listings not found.")
+            encoded = encode_body(listings)
+
+        if query_options:
+            try:
+                listings, next_cursor = await listings_db.find(sku, intent, attributes, sort, limit, cursor, field_list)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor.")
+            return encoded_response(request, encode_body(listings), {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+        if not encoded:
             raise HTTPException(status_code=404, detail="Listings not found.")
 
-        return listings
+        return encoded_response(request, encoded)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.write_log("error", f"Failed to get listings: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
     
 
+@app.get("/listings/summary")
+async def get_listings_summary(request: Request, sku: str) -> Response:
+    """
+    Get the order book summary of a specific item: the number of buy and sell
+    listings, the best listings on each side by price in refined metal, and the spread.
+
+    Args:
+        request (Request): Request object.
+        sku (str): SKU of the item.
+
+    Returns:
+        Response: JSON order book summary, or an empty 304 response if it matches the If-None-Match header.
+    """
+    try:
+        token = request.headers.get("Authorization", "")
+        if not auth_token.token_valid(token):
+            raise HTTPException(status_code=401, detail="Unauthorized.")
+
+        if not translation.test_sku(sku):
+            raise HTTPException(status_code=400, detail="Invalid SKU.")
+
+        demand_counts[sku] = demand_counts.get(sku, 0) + 1
+
+        if not await is_stored_item(sku):
+            cache.add_item(sku)
+            await listings_manager.get_listings(sku)
+
+        summary = await summaries_db.get(sku)
+        if not summary:
+            # Items stored before summaries were kept, and not written since, get theirs built now
+            await summaries_db.update(sku)
+            summary = await summaries_db.get(sku)
+        if not summary or not summary["buy"]["count"] + summary["sell"]["count"]:
+            raise HTTPException(status_code=404, detail="Listings not found.")
+
+        return encoded_response(request, encode_body(summary))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.write_log("error", f"Failed to get listings summary: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+def encode_batch_result(sku: str, encoded: dict = None, status: int = 200, error: str = None) -> bytes:
+    """
+    Encode the result for one item of a batch listings request as a line of JSON.
+
+    Args:
+        sku (str): SKU of the item.
+        encoded (dict): Encoded listings from encode_body, if they were found.
+        status (int): Status of the item's result (default is 200).
+        error (str): Error message, if the listings were not found.
+
+    Returns:
+        bytes: JSON line.
+    """
+    if encoded is not None:
+        # The encoded listings are spliced in, so cached listings are not encoded again
+        return b'{"sku":' + orjson.dumps(sku) + b',"status":200,"listings":' + encoded["body"] + b"}\n"
+    return orjson.dumps({"sku": sku, "status": status, "error": error}) + b"\n"
+
+
+async def fetch_new_listings(sku: str) -> tuple:
+    """
+    Fetch the listings of an item not watched yet from the listings manager, waiting
+    for a free slot when NEW_ITEM_FETCH_LIMIT fetches are already running.
+
+    Args:
+        sku (str): SKU of the item.
+
+    Returns:
+        tuple: SKU of the item, its list of listings and whether the fetch failed.
+    """
+    try:
+        async with new_item_fetches:
+            cache.add_item(sku)
+            return sku, await listings_manager.get_listings(sku), False
+    except Exception as e:
+        logger.write_log("error", f"Failed to fetch listings for {sku}: {e}")
+        return sku, None, True
+
+
+def encode_listings_result(sku: str, listings: list, version: int = None) -> bytes:
+    """
+    Encode the listings of one item of a batch listings request, caching them if a cache version is given.
+
+    Args:
+        sku (str): SKU of the item.
+        listings (list): List of listings.
+        version (int): Invalidation count of the item from before the listings were read, or None to not cache them.
+
+    Returns:
+        bytes: JSON line.
+    """
+    try:
+        if not listings:
+            return encode_batch_result(sku, status=404, error="Listings not found.")
+
+        encoded = encode_body(listings)
+        if version is not None:
+            listings_cache.put(sku, encoded, version)
+        return encode_batch_result(sku, encoded)
+    except Exception as e:
+        logger.write_log("error", f"Failed to encode listings for {sku}: {e}")
+        return encode_batch_result(sku, status=500, error="Failed to get listings.")
+
+
+async def stream_batch_results(invalid_skus: list, stored_skus: list, new_skus: list):
+    """
+    Stream the listings of a batch of items, one line per item as soon as it is ready.
+
+    Items not watched yet are fetched from the listings manager in the background,
+    while stored items are sent from the listings cache or read with one query.
+    Every item gets a line, with status 500 if its listings could not be sent.
+
+    Args:
+        invalid_skus (list): SKUs that failed validation.
+        stored_skus (list): SKUs of items with stored listings.
+        new_skus (list): SKUs of items not watched yet.
+
+    Yields:
+        bytes: JSON line with the SKU and its listings, or its status and an error message.
+    """
+    remaining = set(stored_skus) | set(new_skus)
+    fetches = [asyncio.create_task(fetch_new_listings(sku)) for sku in new_skus]
+    try:
+        for sku in invalid_skus:
+            yield encode_batch_result(sku, status=400, error="Invalid SKU.")
+
+        missed_skus = []
+        for sku in stored_skus:
+            encoded = listings_cache.get(sku)
+            if encoded is None:
+                missed_skus.append(sku)
+            else:
+                remaining.discard(sku)
+                yield encode_batch_result(sku, encoded)
+
+        if missed_skus:
+            versions = {sku: listings_cache.get_version(sku) for sku in missed_skus}
+            listings_by_sku = await listings_db.get_many(missed_skus)
+            for sku in missed_skus:
+                remaining.discard(sku)
+                if listings_by_sku is None:
+                    yield encode_batch_result(sku, status=500, error="Failed to get listings.")
+                else:
+                    yield encode_listings_result(sku, listings_by_sku[sku], versions[sku])
+
+        for fetch in asyncio.as_completed(fetches):
+            sku, listings, failed = await fetch
+            remaining.discard(sku)
+            if failed:
+                yield encode_batch_result(sku, status=500, error="Failed to get listings.")
+            else:
+                yield encode_listings_result(sku, listings)
+    except Exception as e:
+        logger.write_log("error", f"Failed to stream batch listings: {e}")
+        for sku in remaining:
+            yield encode_batch_result(sku, status=500, error="Failed to get listings.")
+    finally:
+        for fetch in fetches:
+            fetch.cancel()
+
+
+@app.post("/listings/batch")
+async def get_listings_batch(request: Request, data: dict) -> StreamingResponse:
+    """
+    Get listings for many items in one request.
+
+    The response is newline-delimited JSON with one line per item, in the order
+    the items are ready: {"sku", "status": 200, "listings"} for found items and
+    {"sku", "status", "error"} otherwise.
+
+    Args:
+        request (Request): Request object.
+        data (dict): Input data containing the list of SKUs.
+
+    Returns:
+        StreamingResponse: Stream of per-item results.
+    """
+    try:
+        token = request.headers.get("Authorization", "")
+        if not auth_token.token_valid(token):
+            raise HTTPException(status_code=401, detail="Unauthorized.")
+
+        skus = data.get("skus")
+        if not isinstance(skus, list) or not skus:
+            raise HTTPException(status_code=400, detail="SKUs are required.")
+        if len(skus) > MAX_BATCH_SKUS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SKUS} SKUs can be requested at once.")
+
+        invalid_skus, stored_skus, new_skus = [], [], []
+        for sku in dict.fromkeys(str(sku) for sku in skus):
+            if not translation.test_sku(sku):
+                invalid_skus.append(sku)
+                continue
+
+            demand_counts[sku] = demand_counts.get(sku, 0) + 1
+            if await is_stored_item(sku):
+                stored_skus.append(sku)
+            else:
+                new_skus.append(sku)
+
+        return StreamingResponse(stream_batch_results(invalid_skus, stored_skus, new_skus), media_type="application/x-ndjson")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.write_log("error", f"Failed to get batch listings: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
 @app.delete("/listings/{sku}")
 async def delete_listings(request: Request, sku: str) -> dict:
     """
@@ -110,11 +468,14 @@ async def delete_listings(request: Request, sku: str) -> dict:
         if not auth_token.token_valid(token):
             raise HTTPException(status_code=401, detail="Unauthorized.")
 
-        if not tf2.test_sku(sku):
+        if not translation.test_sku(sku):
             raise HTTPException(status_code=400, detail="Invalid SKU.")
         
         cache.remove_item(sku)
         await listings_db.delete_all(sku)
+        listings_cache.invalidate(sku)
+        await summaries_db.delete(sku)
+        await ws_manager.remove_item_from_cache(sku)
         return {"success": True}
     except Exception as e:
         logger.write_log("error", f"Failed to delete listings: {e}")
@@ -196,7 +557,7 @@ class ConnectionManager:
             message (dict): Message to broadcast.
         """
         try:
-            for connection in self.active_connections:
+            for connection in self.active_connections.copy():
                 try:
                     await connection.send_text(json.dumps(message))
                 except Exception as e:
@@ -209,6 +570,49 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+async def broadcast_item_updates() -> None:
+    """
+    Poll the websocket manager for item updates, invalidate the cached listings of
+    the updated items and broadcast the updates to all connected clients.
+    A single poller follows the update feed's sequence number, so every client gets every update.
+    """
+    feed_id = None
+    since = None
+    while True:
+        await asyncio.sleep(1)
+        try:
+            feed = await ws_manager.get_item_updates(since)
+            if not feed:
+                continue
+
+            # The cursor belongs to the previous feed if the websocket manager restarted,
+            # so the new feed is read from its start on the next poll
+            if feed["feed"] != feed_id:
+                if feed_id is not None:
+                    logger.write_log("warning", "Websocket manager restarted, reading its item updates from the start")
+                listings_cache.clear()
+                since = 0 if feed_id is not None else feed["seq"]
+                feed_id = feed["feed"]
+                continue
+
+            if feed["truncated"]:
+                logger.write_log("warning", f"Item updates after {since} were partly dropped by the websocket manager")
+                listings_cache.clear()
+            since = feed["seq"]
+
+            for update in feed["updates"]:
+                listings_cache.invalidate(update["sku"])
+
+            item_updates = [{"sku": update["sku"], "name": update["name"]} for update in feed["updates"]]
+            if not item_updates or not manager.active_connections:
+                continue
+
+            await manager.broadcast(item_updates)
+            logger.write_log("info", f"Item updates broadcasted: {len(item_updates)} items")
+        except Exception as e:
+            logger.write_log("error", f"Failed to broadcast item updates: {e}")
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket) -> None:
     """
@@ -219,13 +623,8 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     """
     await manager.connect(websocket)
     try:
+        # Updates are pushed by broadcast_item_updates, this only waits for the client to leave
         while True:
-            await asyncio.sleep(1)
-            item_updates = await ws_manager.get_item_updates()
-            if not item_updates:
-                continue
-
-            await manager.broadcast(item_updates)
-            logger.write_log("info", f"Item updates broadcasted: {len(item_updates)} items")
+            await websocket.receive_text()
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -9,3 +9,8 @@ LISTINGS_MANAGER_URL = os.getenv("LISTINGS_MANAGER_URL")
 STEAM_API_KEY = os.getenv("STEAM_API_KEY")
 SAVE_USER_DATA = os.getenv("SAVE_USER_DATA", "false").lower() == "true"
 WS_MANAGER_URL = os.getenv("WS_MANAGER_URL")
+LISTINGS_LAYOUT = os.getenv("LISTINGS_LAYOUT", "collections").lower()
+LISTINGS_CACHE_SIZE = int(os.getenv("LISTINGS_CACHE_SIZE", 1000))
+LISTINGS_CACHE_TTL = float(os.getenv("LISTINGS_CACHE_TTL", 60))
+SUMMARY_DEPTH = int(os.getenv("SUMMARY_DEPTH", 5))
+NEW_ITEM_FETCH_LIMIT = int(os.getenv("NEW_ITEM_FETCH_LIMIT", 4))
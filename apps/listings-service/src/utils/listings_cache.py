@@ -0,0 +1,122 @@
+from utils.config import LISTINGS_CACHE_SIZE, LISTINGS_CACHE_TTL
+from collections import OrderedDict
+import time
+
+
+class ListingsCache:
+
+    def __init__(self, max_items: int = LISTINGS_CACHE_SIZE, ttl: float = LISTINGS_CACHE_TTL) -> None:
+        """
+        Initialize the ListingsCache class.
+
+        Keeps the encoded listings of the most recently requested items in memory. Entries
+        are invalidated when the websocket manager reports an update of their item,
+        and expire after the TTL to catch writes that do not go through its update feed.
+
+        Args:
+            max_items (int): Maximum number of items cached (default is LISTINGS_CACHE_SIZE).
+            ttl (float): Seconds an entry is served for (default is LISTINGS_CACHE_TTL).
+        """
+        self.max_items = max_items
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.cleared = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+
+    def get_version(self, sku: str) -> int:
+        """
+        Get the invalidation count of an item, taken before reading its listings from the database.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            int: Invalidation count of the item.
+        """
+        return self.cleared + self.versions.get(sku, 0)
+
+
+    def get(self, sku: str) -> list:
+        """
+        Get the cached listings of an item.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            dict: Encoded listings from encode_body, or None if the item is not cached.
+        """
+        entry = self.entries.get(sku)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        listings, cached_at = entry
+        if time.time() - cached_at > self.ttl:
+            del self.entries[sku]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self.entries.move_to_end(sku)
+        self.stats["hits"] += 1
+        return listings
+
+
+    def put(self, sku: str, listings: dict, version: int) -> None:
+        """
+        Cache the listings of an item, unless the item was updated while they were read.
+
+        Args:
+            sku (str): SKU of the item.
+            listings (dict): Encoded listings from encode_body.
+            version (int): Invalidation count of the item from before the listings were read.
+        """
+        if self.max_items <= 0 or version != self.get_version(sku):
+            return
+
+        self.entries[sku] = (listings, time.time())
+        self.entries.move_to_end(sku)
+        while len(self.entries) > self.max_items:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+    def invalidate(self, sku: str) -> None:
+        """
+        Drop the cached listings of an updated item.
+
+        Args:
+            sku (str): SKU of the item.
+        """
+        self.versions[sku] = self.versions.get(sku, 0) + 1
+        if self.entries.pop(sku, None) is not None:
+            self.stats["invalidations"] += 1
+
+
+    def clear(self) -> None:
+        """
+        Drop all cached listings, when updates of the websocket manager may have been missed.
+        """
+        self.cleared += 1
+        self.stats["invalidations"] += len(self.entries)
+        self.entries.clear()
+
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Number of cached items and hit, miss, eviction, expiration and invalidation counts.
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "items": len(self.entries),
+            "max_items": self.max_items,
+            "ttl": self.ttl,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else None,
+            **self.stats,
+        }
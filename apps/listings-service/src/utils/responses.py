@@ -0,0 +1,59 @@
+from fastapi import Request, Response
+import hashlib
+import orjson
+import gzip
+
+
+# Bodies smaller than this are sent uncompressed.
+GZIP_MIN_SIZE = 1024
+
+
+def encode_body(data) -> dict:
+    """
+    Encode a response body once, so it can be sent many times.
+
+    The ETag is a hash of the encoded body, so it only changes when the
+    body does and is the same on every instance of the service.
+
+    Args:
+        data: JSON serializable response data.
+
+    Returns:
+        dict: Encoded body, its ETag and its gzip-compressed body once it was needed.
+    """
+    body = orjson.dumps(data)
+    return {"body": body, "etag": f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"', "gzip": None}
+
+
+def encoded_response(request: Request, encoded: dict, headers: dict = None) -> Response:
+    """
+    Build the response for an encoded body, answering 304 if the client already has it.
+
+    Args:
+        request (Request): Request object.
+        encoded (dict): Encoded body from encode_body.
+        headers (dict): Additional response headers.
+
+    Returns:
+        Response: Response with the body, gzip-compressed if the client accepts it, or a 304 response.
+    """
+    use_gzip = len(encoded["body"]) >= GZIP_MIN_SIZE and "gzip" in request.headers.get("Accept-Encoding", "")
+
+    # Each content coding is a different representation, so the gzip body gets its own strong ETag
+    gzip_etag = encoded["etag"][:-1] + '-gz"'
+    etag = gzip_etag if use_gzip else encoded["etag"]
+    headers = {**(headers or {}), "ETag": etag, "Vary": "Accept-Encoding"}
+
+    # Either ETag shows the client already has the current listings
+    if_none_match = {tag.strip().removeprefix("W/") for tag in request.headers.get("If-None-Match", "").split(",")}
+    if "*" in if_none_match or encoded["etag"] in if_none_match or gzip_etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+
+    body = encoded["body"]
+    if use_gzip:
+        if encoded["gzip"] is None:
+            encoded["gzip"] = gzip.compress(body, compresslevel=6)
+        body = encoded["gzip"]
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,4 +1,5 @@
 from utils.config import STEAM_API_KEY
 from tf2utilities.main import TF2
 
-tf2 = TF2(STEAM_API_KEY, auto_update=True).schema
+# Keep the client rather than its schema, so auto-updates are picked up
+tf2_client = TF2(STEAM_API_KEY, auto_update=True)
@@ -0,0 +1,29 @@
+from utils.config import LISTINGS_MANAGER_URL
+from utils.logger import SyncLogger
+import aiohttp
+
+
+class ListingsManager:
+
+    def __init__(self) -> None:
+        """
+        Initialize the ListingsManager class.
+        """
+        self.url = LISTINGS_MANAGER_URL
+        self.logger = SyncLogger("ListingsManager")
+
+
+    async def refresh_items(self, skus: list) -> None:
+        """
+        Ask the listings manager to refresh items ahead of its regular update cycle.
+        
+        Args:
+            skus (list): SKUs of the items, most urgent first.
+        """
+        try:
+            data = {"skus": skus}
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{self.url}/refresh", json=data, timeout=10) as response:
+                    response.raise_for_status()
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to request items refresh: {e}")
@@ -1,4 +1,6 @@
-from utils.config import DATABASE_URL
+from utils.config import DATABASE_URL, LISTINGS_LAYOUT
+from pymongo import UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
 from utils.logger import SyncLogger
 import motor.motor_asyncio
 
@@ -6,6 +8,29 @@ import motor.motor_asyncio
 client = motor.motor_asyncio.AsyncIOMotorClient(DATABASE_URL, minPoolSize=10, maxPoolSize=200)
 
 
+# Name of the collection holding every listing with the unified layout.
+UNIFIED_COLLECTION = "listings"
+
+
+def get_unified_id(sku: str, listing_id: str) -> str:
+    """
+    Get the ID of a listing in the unified collection. Buy listing IDs are only
+    unique per item, so the SKU is part of the ID.
+
+    Args:
+        sku (str): SKU of the item.
+        listing_id (str): ID of the listing.
+
+    Returns:
+        str: ID of the listing document.
+    """
+    return f"{sku}|{listing_id}"
+
+
+# Per-SKU collections whose price index was created by this process.
+indexed_skus = set()
+
+
 class ListingsDatabase:
 
     def __init__(self) -> None:
@@ -15,6 +40,72 @@ class ListingsDatabase:
         self.db = client["backpacktf_listings"]
         self.logger = SyncLogger("ListingsDatabase")
 
+        # With the unified layout, listings of all items share one collection instead of one collection per SKU
+        self.unified = LISTINGS_LAYOUT == "unified"
+        self.listings = self.db[UNIFIED_COLLECTION]
+
+        # With the unified layout, watched items are recorded here, as an item without listings leaves no trace in the listings collection
+        self.watched_items = client["backpacktf_items"]["items"]
+
+
+    def get_collection(self, sku: str) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        """
+        Get the collection holding an item's listings.
+
+        Args:
+            sku (str): SKU of the item.
+
+        Returns:
+            AsyncIOMotorCollection: Collection of the listings.
+        """
+        return self.listings if self.unified else self.db[sku]
+
+
+    def get_filter(self, sku: str, listing_id: str = None) -> dict:
+        """
+        Get the query matching an item's listings, or one of them.
+
+        Args:
+            sku (str): SKU of the item.
+            listing_id (str): ID of the listing, or None for all of the item's listings.
+
+        Returns:
+            dict: Query filter.
+        """
+        if listing_id is not None:
+            return {"_id": get_unified_id(sku, listing_id) if self.unified else listing_id}
+        return {"sku": sku} if self.unified else {}
+
+
+    def get_document(self, sku: str, listing: dict) -> dict:
+        """
+        Get the stored document of a listing.
+
+        Args:
+            sku (str): SKU of the item.
+            listing (dict): Listing data.
+
+        Returns:
+            dict: Listing document.
+        """
+        if not self.unified:
+            return listing
+        return {**listing, "_id": get_unified_id(sku, listing["_id"]), "sku": sku}
+
+
+    async def create_indexes(self) -> None:
+        """
+        Create the indexes of the unified listings collection.
+        """
+        if not self.unified:
+            return
+
+        try:
+            await self.listings.create_index([("sku", 1), ("intent", 1), ("price", 1)])
+            await self.listings.create_index("steamID")
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to create indexes: {e}")
+
 
     async def get_collections(self) -> list:
         """
@@ -24,7 +115,13 @@ class ListingsDatabase:
             list: List of collections.
         """
         try:
-            return await self.db.list_collection_names()
+            if self.unified:
+                # Items with listings are included for data written before watched items were recorded
+                watched = await self.watched_items.distinct("_id")
+                return list(set(watched) | set(await self.listings.distinct("sku")))
+
+            collections = await self.db.list_collection_names()
+            return [name for name in collections if name != UNIFIED_COLLECTION]
         except Exception as e:
             self.logger.write_log("error", f"Failed to get collections: {e}")
 
@@ -40,7 +137,7 @@ class ListingsDatabase:
             list: List of listings.
         """
         try:
-            cursor = self.db[sku].find({}, {"_id": False})
+            cursor = self.get_collection(sku).find(self.get_filter(sku), {"_id": False})
             return await cursor.to_list(length=None)
         except Exception as e:
             self.logger.write_log("error", f"Failed to get listings: {e}")
@@ -55,7 +152,7 @@ class ListingsDatabase:
             listings (list): List of listings.
         """
         try:
-            await self.db[sku].update_one({"_id": listings["_id"]}, {"$set": listings}, upsert=True)
+            await self.get_collection(sku).update_one(self.get_filter(sku, listings["_id"]), {"$set": self.get_document(sku, listings)}, upsert=True)
         except Exception as e:
             self.logger.write_log("error", f"Failed to update listings: {e}")
 
@@ -69,6 +166,64 @@ class ListingsDatabase:
             id (str): ID of the listing.
         """
         try:
-            await self.db[sku].delete_one({"_id": id})
+            await self.get_collection(sku).delete_one(self.get_filter(sku, id))
         except Exception as e:
             self.logger.write_log("error", f"Failed to delete listing: {e}")
+
+
+    async def create_price_index(self, sku: str) -> None:
+        """
+        Create the price index of an item's collection, once per process. With the
+        unified layout, the compound index of the listings collection covers it.
+
+        Args:
+            sku (str): SKU of the item.
+        """
+        if self.unified or sku in indexed_skus:
+            return
+
+        try:
+            await self.db[sku].create_index([("intent", 1), ("price", 1)])
+            indexed_skus.add(sku)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to create price index for {sku}: {e}")
+
+
+    async def bulk_write(self, sku: str, operations: list) -> dict:
+        """
+        Apply a batch of listing upserts and deletions in a single round-trip.
+
+        Args:
+            sku (str): SKU of the item.
+            operations (list): List of (listing_id, listing) tuples, where listing is None for deletions.
+
+        Returns:
+            dict: Number of upserted, modified and deleted listings, and the number of failed operations.
+        """
+        # An unordered bulk write applies all updates before all deletions, so only the last operation per listing is sent
+        operations = list(dict(operations).items())
+        requests = [
+            DeleteOne(self.get_filter(sku, listing_id)) if listing is None
+            else UpdateOne(self.get_filter(sku, listing_id), {"$set": self.get_document(sku, listing)}, upsert=True)
+            for listing_id, listing in operations
+        ]
+        summary = {"upserted": 0, "modified": 0, "deleted": 0, "failed": 0}
+        await self.create_price_index(sku)
+
+        try:
+            result = await self.get_collection(sku).bulk_write(requests, ordered=False)
+            summary["upserted"] = result.upserted_count
+            summary["modified"] = result.modified_count
+            summary["deleted"] = result.deleted_count
+        except BulkWriteError as e:
+            details = e.details
+            summary["upserted"] = details.get("nUpserted", 0)
+            summary["modified"] = details.get("nModified", 0)
+            summary["deleted"] = details.get("nRemoved", 0)
+            summary["failed"] = len(details.get("writeErrors", []))
+            self.logger.write_log("error", f"Failed to write {summary['failed']} of {len(requests)} listings for {sku}")
+        except Exception as e:
+            summary["failed"] = len(requests)
+            self.logger.write_log("error", f"Failed to bulk write listings for {sku}: {e}")
+
+        return summary
@@ -1,4 +1,6 @@
 from database.listings import client
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from utils.logger import SyncLogger
 
 
@@ -24,3 +26,29 @@ class UsersDatabase:
             await self.collection.update_one({"_id": user["id"]}, {"$set": user}, upsert=True)
         except Exception as e:
             self.logger.write_log("error", f"Failed to insert user: {e}")
+
+
+    async def bulk_upsert(self, users: list) -> int:
+        """
+        Upsert users into the database in a single batch.
+
+        Args:
+            users (list): List of user data.
+
+        Returns:
+            int: Number of users written.
+        """
+        if not users:
+            return 0
+
+        requests = [UpdateOne({"_id": user["id"]}, {"$set": user}, upsert=True) for user in users]
+        try:
+            result = await self.collection.bulk_write(requests, ordered=False)
+            return result.upserted_count + result.matched_count
+        except BulkWriteError as e:
+            details = e.details
+            self.logger.write_log("error", f"Failed to upsert {len(details.get('writeErrors', []))} of {len(users)} users")
+            return details.get("nUpserted", 0) + details.get("nMatched", 0)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to upsert users: {e}")
+            return 0
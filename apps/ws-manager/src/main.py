@@ -3,6 +3,7 @@ from utils.queue import ListingsQueueService
 from fastapi import FastAPI, HTTPException
 from contextlib import asynccontextmanager  
 from utils.cache import CacheService
+from utils.pricing import KeyPriceService
 from utils.logger import SyncLogger
 import asyncio
 
@@ -11,6 +12,7 @@ listings_queue = ListingsQueueService()
 logger = SyncLogger("WsManagerAPI")
 bptf_ws = BackpackTFWebSocket()
 cache = CacheService()
+key_prices = KeyPriceService()
 
 
 @asynccontextmanager
@@ -22,9 +24,18 @@ async def lifespan(app: FastAPI):
         app (FastAPI): FastAPI application.
     """
     logger.write_log("info", "Starting API server lifespan")
+    await bptf_ws.listings_db.create_indexes()
+    await cache.refresh_cache()
+    await key_prices.refresh()
     asyncio.gather(
         bptf_ws.connect(), 
         bptf_ws.handle_messages(),
+        bptf_ws.run_workers(),
+        bptf_ws.collect_frames(),
+        bptf_ws.users_buffer.run(),
+        bptf_ws.update_summaries(),
+        cache.run(),
+        key_prices.run(),
         )
     yield
     logger.write_log("info", "Stopping API server lifespan")
@@ -49,6 +60,21 @@ async def health_check() -> dict:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
+@app.get("/stats")
+async def get_stats() -> dict:
+    """
+    Get ingest statistics.
+
+    Returns:
+        dict: Queue, cache and worker statistics.
+    """
+    try:
+        return bptf_ws.get_stats()
+    except Exception as e:
+        logger.write_log("error", f"Failed to get stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
 @app.post("/item")
 async def add_item_to_cache(item: dict) -> dict:
     """
@@ -72,6 +98,29 @@ async def add_item_to_cache(item: dict) -> dict:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
+@app.delete("/item")
+async def remove_item_from_cache(item: dict) -> dict:
+    """
+    Remove an item from the cache.
+
+    Args:
+        item (dict): A dictionary containing item details, including SKU.
+
+    Returns:
+        dict: A response indicating the result of the operation.
+    """
+    try:
+        item_sku = item.get("item_sku")
+        if not item_sku:
+            raise HTTPException(status_code=400, detail="SKU is required.")
+        
+        cache.remove_item(item_sku)
+        return {"success": True, "message": "Item removed from cache successfully."}
+    except Exception as e:
+        logger.write_log("error", f"Failed to remove item from cache: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
 @app.delete("/queue")
 async def delete_item_updates(data: dict) -> dict:
     """
@@ -95,18 +144,44 @@ async def delete_item_updates(data: dict) -> dict:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
     
 
+@app.post("/demand")
+async def add_item_demand(data: dict) -> dict:
+    """
+    Add listings service request counts, used to drain updates of requested items first.
+
+    Args:
+        data (dict): Input data containing the number of requests by item SKU.
+
+    Returns:
+        dict: A response indicating the result of the operation.
+    """
+    try:
+        counts = data.get("counts")
+        if not isinstance(counts, dict):
+            raise HTTPException(status_code=400, detail="Request counts are required.")
+
+        listings_queue.add_demand(counts)
+        return {"success": True, "message": "Demand updated successfully."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.write_log("error", f"Failed to update demand: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
 @app.get("/item-updates")
-async def fetch_item_updates() -> list:
+async def fetch_item_updates(since: int = None) -> dict:
     """
-    Retrieve the latest updates on item listings.
+    Retrieve the item listing updates published after a sequence number.
+
+    Args:
+        since (int): Last sequence number seen by the caller. If omitted, only the current sequence number is returned.
 
     Returns:
-        list: A list of updated item details.
+        dict: Feed ID, current sequence number, whether older updates were already dropped and the updated item details.
     """
     try:
-        updates = bptf_ws.updated_items.copy()
-        bptf_ws.updated_items.clear()
-        return updates
+        return bptf_ws.updates_feed.read(since)
     except Exception as e:
         logger.write_log("error", f"Failed to fetch item updates: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
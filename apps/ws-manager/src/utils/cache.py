@@ -1,10 +1,13 @@
 from database.listings import ListingsDatabase
 from utils.logger import SyncLogger
-from utils.utils import tf2
+from utils.translation import translation
+import asyncio
 import time
 
 
-cache_database = {}
+# Watched items, by name and by SKU. The maps are only mutated on the event loop,
+# so lookups from the ingest path never wait on a refresh.
+cache_database = {"last_update": 0, "version": 0, "items": {}, "skus": {}}
 
 
 class CacheService:
@@ -15,11 +18,12 @@ class CacheService:
         """
         self.logger = SyncLogger("CacheService")
         self.db = ListingsDatabase()
+        self.refresh_interval = 1800
 
 
-    async def check_item_exists(self, item_name: str) -> bool:
+    def check_item_exists(self, item_name: str) -> bool:
         """
-        Check if the item exists in the cache or the database.
+        Check if the item exists in the cache.
 
         Args:
             item_name (str): Name of the item.
@@ -27,54 +31,109 @@ class CacheService:
         Returns:
             bool: True if the item exists, False otherwise.
         """
-        current_time = time.time()
+        return item_name in cache_database["items"]
 
-        if (
-            not cache_database 
-            or not cache_database.get("last_update")
-            or (current_time - cache_database["last_update"]) > 1800
-        ):
-            await self.refresh_cache()
 
-        return item_name in cache_database.get("items", {})
+    async def run(self) -> None:
+        """
+        Keep the cache in sync with the database in the background.
+        """
+        while True:
+            # Retry sooner until the first refresh has succeeded
+            await asyncio.sleep(self.refresh_interval if cache_database["last_update"] else 60)
+            try:
+                await self.refresh_cache()
+            except Exception as e:
+                self.logger.write_log("error", f"Failed to refresh cache: {e}")
 
 
     async def refresh_cache(self) -> None:
         """
-        Refresh the cache with items in the database.
+        Refresh the cache with items in the database, resolving names only for new items.
         """
-        global cache_database
         db_collections = await self.db.get_collections()
+        if db_collections is None:
+            return
+
+        current_skus = set(db_collections)
+        known_skus = set(cache_database["skus"])
+
+        removed_skus = known_skus - current_skus
+        for item_sku in removed_skus:
+            self.discard(item_sku)
+
+        new_skus = list(current_skus - known_skus)
+        if new_skus:
+            names = await asyncio.to_thread(lambda: [translation.get_name_from_sku(item_sku) for item_sku in new_skus])
+            for item_sku, item_name in zip(new_skus, names):
+                # Items added while the names were being resolved are already up to date
+                if item_name and item_sku not in cache_database["skus"]:
+                    cache_database["items"][item_name] = item_sku
+                    cache_database["skus"][item_sku] = item_name
+
+        if removed_skus or new_skus:
+            cache_database["version"] += 1
+        cache_database["last_update"] = time.time()
+        self.logger.write_log(
+            "info",
+            f"Successfully refreshed cache with {len(cache_database['items'])} items "
+            f"({len(new_skus)} added, {len(removed_skus)} removed)"
+        )
 
-        items = {
-            tf2.get_name_from_sku(item_sku): item_sku 
-            for item_sku in db_collections
-        }
 
-        cache_database = {
-            "last_update": time.time(),
-            "items": items
-        }
+    def add_item(self, item_sku: str) -> None:
+        """
+        Add item to the cache.
 
-        self.logger.write_log("info", f"Successfully refreshed cache with {len(items)} items")
+        Args:
+            item_sku (str): SKU of the item.
+        """
+        if item_sku not in cache_database["skus"]:
+            item_name = translation.get_name_from_sku(item_sku)
+            cache_database["items"][item_name] = item_sku
+            cache_database["skus"][item_sku] = item_name
+            cache_database["version"] += 1
+            self.logger.write_log("info", f"Added item to cache: {item_name}")
 
 
-    def add_item(self, item_sku: str) -> None:
+    def remove_item(self, item_sku: str) -> None:
         """
-        Add item to the cache.
+        Remove item from the cache.
 
         Args:
             item_sku (str): SKU of the item.
         """
-        global cache_database
+        item_name = self.discard(item_sku)
+        if item_name:
+            self.logger.write_log("info", f"Removed item from cache: {item_name}")
 
-        if "items" not in cache_database:
-            cache_database["items"] = {}
 
-        if item_sku not in cache_database["items"].values():
-            item_name = tf2.get_name_from_sku(item_sku)
-            cache_database["items"][item_name] = item_sku
-            self.logger.write_log("info", f"Added item to cache: {item_name}")
+    def discard(self, item_sku: str) -> str:
+        """
+        Drop an item from both cache maps.
+
+        Args:
+            item_sku (str): SKU of the item.
+
+        Returns:
+            str: Name of the removed item, or None if it was not cached.
+        """
+        item_name = cache_database["skus"].pop(item_sku, None)
+        if item_name is not None and cache_database["items"].get(item_name) == item_sku:
+            del cache_database["items"][item_name]
+        if item_name is not None:
+            cache_database["version"] += 1
+        return item_name
+
+
+    def get_snapshot(self) -> tuple:
+        """
+        Get the watched items together with the version of the cache.
+
+        Returns:
+            tuple: Version of the cache and the watched items, by name.
+        """
+        return cache_database["version"], cache_database["items"]
 
 
     def get_sku_from_name(self, item_name: str) -> str:
@@ -88,3 +147,17 @@ class CacheService:
             str: The SKU of the item if found, otherwise None.
         """
         return cache_database["items"].get(item_name, None)
+
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Number of cached items, version and time of the last refresh.
+        """
+        return {
+            "items": len(cache_database["items"]),
+            "version": cache_database["version"],
+            "last_update": cache_database["last_update"],
+        }
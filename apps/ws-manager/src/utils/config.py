@@ -6,3 +6,23 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 SAVE_USER_DATA = os.getenv("SAVE_USER_DATA", "false").lower() == "true"
 STEAM_API_KEY = os.getenv("STEAM_API_KEY")
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", 8))
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", 100))
+QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", 50000))
+QUEUE_OVERFLOW = os.getenv("QUEUE_OVERFLOW", "spill").lower()
+QUEUE_LOG_PATH = os.getenv("QUEUE_LOG_PATH", "../data/queue_log")
+QUEUE_LOG_SEGMENT_SIZE = int(os.getenv("QUEUE_LOG_SEGMENT_SIZE", 16 * 1024 * 1024))
+INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", 0))
+FRAME_PREFILTER = os.getenv("FRAME_PREFILTER", "true").lower() == "true"
+UPDATES_FEED_SIZE = int(os.getenv("UPDATES_FEED_SIZE", 10000))
+LISTINGS_MANAGER_URL = os.getenv("LISTINGS_MANAGER_URL")
+GAP_ACTIVITY_WINDOW = int(os.getenv("GAP_ACTIVITY_WINDOW", 3600))
+USER_FLUSH_INTERVAL = float(os.getenv("USER_FLUSH_INTERVAL", 5))
+USER_FLUSH_SIZE = int(os.getenv("USER_FLUSH_SIZE", 1000))
+USER_HASH_TTL = int(os.getenv("USER_HASH_TTL", 3600))
+LISTINGS_LAYOUT = os.getenv("LISTINGS_LAYOUT", "collections").lower()
+KEY_PRICE = float(os.getenv("KEY_PRICE", 60))
+SUMMARY_DEPTH = int(os.getenv("SUMMARY_DEPTH", 5))
+SUMMARY_INTERVAL = float(os.getenv("SUMMARY_INTERVAL", 1))
+WRITE_RETRIES = int(os.getenv("WRITE_RETRIES", 5))
+FAILED_WRITES_PATH = os.getenv("FAILED_WRITES_PATH", "../data/failed_writes.jsonl")
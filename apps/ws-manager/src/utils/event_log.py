@@ -0,0 +1,202 @@
+import orjson
+import mmap
+import os
+
+
+class EventLog:
+
+    def __init__(self, path: str, segment_size: int) -> None:
+        """
+        Initialize the EventLog class.
+
+        The log is a directory of append-only segment files holding one JSON record per line.
+        Positions in the log are (segment, offset) tuples, so they compare in log order.
+
+        Args:
+            path (str): Directory of the log.
+            segment_size (int): Size in bytes after which a new segment is started.
+        """
+        self.path = path
+        self.segment_size = segment_size
+        self.checkpoint_path = os.path.join(path, "checkpoint.json")
+        self.opened = False
+        self.writer = None
+        self.write_segment = 1
+        self.write_offset = 0
+        self.read_position = (1, 0)
+        self.committed = (1, 0)
+        self.purges = {}
+
+
+    def get_segment_path(self, segment: int) -> str:
+        """
+        Get the path of a segment file.
+
+        Args:
+            segment (int): Segment number.
+
+        Returns:
+            str: Path of the segment file.
+        """
+        return os.path.join(self.path, f"{segment:08d}.log")
+
+
+    def list_segments(self) -> list:
+        """
+        List the segments on disk.
+
+        Returns:
+            list: Sorted segment numbers.
+        """
+        return sorted(int(name[:-4]) for name in os.listdir(self.path) if name.endswith(".log") and name[:-4].isdigit())
+
+
+    def open(self) -> int:
+        """
+        Open the log, resuming from the last committed position.
+
+        Returns:
+            int: Number of records that were written but not applied before the last shutdown.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "rb") as file:
+                checkpoint = orjson.loads(file.read())
+            self.committed = tuple(checkpoint["position"])
+            self.purges = {name: tuple(position) for name, position in checkpoint.get("purges", {}).items()}
+
+        segments = self.list_segments()
+        for segment in segments:
+            if segment < self.committed[0]:
+                os.remove(self.get_segment_path(segment))
+        segments = [segment for segment in segments if segment >= self.committed[0]]
+
+        # Always append to a fresh segment, so a record torn by a crash is never extended
+        self.write_segment = max(segments[-1] + 1 if segments else 1, self.committed[0])
+        self.write_offset = 0
+        if not segments:
+            self.committed = (self.write_segment, 0)
+        self.read_position = self.committed
+        self.opened = True
+
+        pending = 0
+        for segment in segments:
+            with open(self.get_segment_path(segment), "rb") as file:
+                if segment == self.committed[0]:
+                    file.seek(self.committed[1])
+                while chunk := file.read(1 << 20):
+                    pending += chunk.count(b"\n")
+        return pending
+
+
+    def end_position(self) -> tuple:
+        """
+        Get the position after the last written record.
+
+        Returns:
+            tuple: Segment and offset.
+        """
+        return (self.write_segment, self.write_offset)
+
+
+    def append(self, items: list) -> None:
+        """
+        Append records to the log.
+
+        Args:
+            items (list): List of records.
+        """
+        if self.writer is None:
+            self.writer = open(self.get_segment_path(self.write_segment), "ab")
+
+        data = b"".join(orjson.dumps(item) + b"\n" for item in items)
+        self.writer.write(data)
+        self.writer.flush()
+        self.write_offset += len(data)
+
+        if self.write_offset >= self.segment_size:
+            self.writer.close()
+            self.writer = None
+            self.write_segment += 1
+            self.write_offset = 0
+
+
+    def read(self, limit: int) -> tuple:
+        """
+        Read the next records from the log.
+
+        Args:
+            limit (int): Maximum number of records to read.
+
+        Returns:
+            tuple: List of (position, record) pairs and the position after the last one read.
+        """
+        records = []
+        segment, offset = self.read_position
+        while len(records) < limit:
+            segment_path = self.get_segment_path(segment)
+            size = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+            if offset >= size:
+                if segment >= self.write_segment:
+                    break
+                segment, offset = segment + 1, 0
+                continue
+
+            with open(segment_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                while len(records) < limit:
+                    end = view.find(b"\n", offset)
+                    if end == -1:
+                        break
+                    records.append(((segment, offset), orjson.loads(view[offset:end])))
+                    offset = end + 1
+
+            if len(records) < limit:
+                if segment >= self.write_segment:
+                    break
+                # Skip the torn tail of a segment left by a crash
+                segment, offset = segment + 1, 0
+
+        # Step past a fully read segment, so the read position reaches the end of the log
+        while segment < self.write_segment and offset >= os.path.getsize(self.get_segment_path(segment)):
+            segment, offset = segment + 1, 0
+
+        self.read_position = (segment, offset)
+        return records, self.read_position
+
+
+    def commit(self, position: tuple) -> None:
+        """
+        Mark every record before a position as applied, removing the segments that
+        only hold applied records.
+
+        Args:
+            position (tuple): Segment and offset up to which records were applied.
+        """
+        if position == self.end_position() and position == self.read_position:
+            # Everything was applied, so the log is emptied
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+            for segment in self.list_segments():
+                os.remove(self.get_segment_path(segment))
+            self.write_segment += 1
+            self.write_offset = 0
+            position = self.read_position = self.end_position()
+            self.purges.clear()
+        else:
+            for segment in self.list_segments():
+                if segment < position[0]:
+                    os.remove(self.get_segment_path(segment))
+
+        self.committed = position
+        self.save_checkpoint()
+
+
+    def save_checkpoint(self) -> None:
+        """
+        Save the committed position and item purges, replacing the checkpoint file atomically.
+        """
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(orjson.dumps({"position": self.committed, "purges": self.purges}))
+        os.replace(temp_path, self.checkpoint_path)
@@ -0,0 +1,78 @@
+from collections import deque
+import uuid
+
+
+class UpdatesFeed:
+
+    def __init__(self, max_size: int = 10000) -> None:
+        """
+        Initialize the UpdatesFeed class.
+
+        Args:
+            max_size (int): Maximum number of update records kept (default is 10000).
+        """
+        self.records = deque()
+        self.max_size = max_size
+        self.latest = {}
+        self.seq = 0
+
+        # Sequence numbers restart with the process, so readers compare the feed ID to notice a restart
+        self.feed_id = uuid.uuid4().hex
+
+
+    def publish(self, item_sku: str, item_name: str) -> None:
+        """
+        Publish an item update.
+
+        Earlier records of the same item are left in place and skipped on read,
+        so each item appears at most once in any read.
+
+        Args:
+            item_sku (str): SKU of the item.
+            item_name (str): Name of the item.
+        """
+        self.seq += 1
+        self.records.append((self.seq, item_sku, item_name))
+        self.latest[item_sku] = self.seq
+
+        if len(self.records) > self.max_size:
+            seq, evicted_sku, _ = self.records.popleft()
+            if self.latest.get(evicted_sku) == seq:
+                del self.latest[evicted_sku]
+
+
+    def read(self, since: int = None) -> dict:
+        """
+        Read the item updates published after a sequence number.
+
+        Args:
+            since (int): Last sequence number seen by the reader, or None to only get the current sequence number.
+
+        Returns:
+            dict: Feed ID, current sequence number, updates after the given one and whether older updates were already dropped.
+        """
+        if since is None or since >= self.seq:
+            return {"feed": self.feed_id, "seq": self.seq, "truncated": False, "updates": []}
+
+        oldest = self.records[0][0] if self.records else self.seq + 1
+        truncated = since < oldest - 1
+
+        # Records are in sequence order, so only the ones after the cursor are visited
+        start = max(0, since - oldest + 1)
+        updates = []
+        for index in range(start, len(self.records)):
+            seq, item_sku, item_name = self.records[index]
+            if self.latest.get(item_sku) == seq:
+                updates.append({"seq": seq, "sku": item_sku, "name": item_name})
+
+        return {"feed": self.feed_id, "seq": self.seq, "truncated": truncated, "updates": updates}
+
+
+    def get_stats(self) -> dict:
+        """
+        Get feed statistics.
+
+        Returns:
+            dict: Feed ID, current sequence number, number of records and number of distinct items.
+        """
+        return {"feed": self.feed_id, "seq": self.seq, "records": len(self.records), "items": len(self.latest)}
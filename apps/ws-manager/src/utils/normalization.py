@@ -0,0 +1,224 @@
+from utils.attributes import (
+    spells_attributes,
+    paints_attributes,
+    strange_parts_attributes,
+    killstreak_sheens_attributes,
+    killstreak_effects_attributes,
+)
+
+
+# Reverse lookup tables, built once at import.
+spell_ids = {
+    name.lower(): (defindex, spell_id)
+    for defindex, spells in spells_attributes.items()
+    for spell_id, name in spells.items()
+}
+paint_ids = {name: paint_id for paint_id, name in paints_attributes.items()}
+strange_part_ids = {name: part_id for part_id, name in strange_parts_attributes.items()}
+sheen_ids = {name: sheen_id for sheen_id, name in killstreak_sheens_attributes.items()}
+killstreaker_ids = {name: effect_id for effect_id, name in killstreak_effects_attributes.items()}
+
+# Snapshot attribute defindex -> (document field, id -> name table, whether the field is a list).
+snapshot_attributes = {
+    **{defindex: ("spells", spells, True) for defindex, spells in spells_attributes.items()},
+    142: ("paint", paints_attributes, False),
+    380: ("strangeParts", strange_parts_attributes, True),
+    382: ("strangeParts", strange_parts_attributes, True),
+    384: ("strangeParts", strange_parts_attributes, True),
+    2013: ("killstreaker", killstreak_effects_attributes, False),
+    2014: ("sheen", killstreak_sheens_attributes, False),
+}
+# The API sends defindexes as strings or ints, so both forms are indexed.
+snapshot_attributes.update({str(defindex): handler for defindex, handler in snapshot_attributes.items()})
+
+# Raw (defindex, float_value) -> (document field, entry, whether the field is a list).
+# Only known attribute values are cached, so the table stays as small as the lookup tables.
+snapshot_entries = {}
+
+# WebSocket item field -> (document field, name -> id table).
+websocket_attributes = (
+    ("paint", "paint", paint_ids),
+    ("killstreaker", "killstreaker", killstreaker_ids),
+    ("sheen", "sheen", sheen_ids),
+)
+
+
+def get_spell_id(spell_name: str) -> tuple:
+    """
+    Get spell ID from spell name.
+
+    Args:
+        spell_name (str): Name of the spell.
+
+    Returns:
+        tuple: Spell category and spell ID.
+    """
+    return spell_ids.get(spell_name.lower(), (None, None))
+
+
+def parse_float_value(float_value: str) -> object:
+    """
+    Parse the float value of a snapshot attribute.
+
+    Args:
+        float_value (str): Raw float value.
+
+    Returns:
+        object: The value as an int when it is integral, otherwise as a float, or None if empty.
+    """
+    if not float_value:
+        return None
+    try:
+        return int(float_value)
+    except ValueError:
+        return float(float_value)
+
+
+def get_snapshot_entry(defindex: object, float_value: str) -> tuple:
+    """
+    Resolve a snapshot attribute into its document entry.
+
+    Args:
+        defindex (object): Raw defindex of the attribute.
+        float_value (str): Raw float value of the attribute.
+
+    Returns:
+        tuple: Document field, entry and whether the field is a list.
+    """
+    field, names, is_list = snapshot_attributes[defindex]
+    value = parse_float_value(float_value)
+    if field == "spells":
+        # Spells without a value are the only spell of their category
+        if not value: value = 1
+        return field, {"defindex": int(defindex), "id": value, "name": names[value]}, is_list
+    return field, {"id": value, "name": names[value]}, is_list
+
+
+def normalize_websocket_listing(payload: dict) -> dict:
+    """
+    Turn a WebSocket event payload into a stored listing document.
+
+    Args:
+        payload (dict): Event payload.
+
+    Returns:
+        dict: Listing document.
+    """
+    intent = payload["intent"]
+    steamID = payload["steamid"]
+    item = payload["item"]
+
+    data = {
+        "_id": payload["id"] if intent == "sell" else f"buy_440_{steamID}",
+        "bumpAt": payload["bumpedAt"],
+        "buyoutOnly": payload.get("buyoutOnly", False),
+        "currencies": payload["currencies"],
+        "details": payload.get("details", ""),
+        "intent": intent,
+        "listedAt": payload["listedAt"],
+        "steamID": steamID,
+        "tradeOffersPreferred": payload.get("tradeOffersPreferred", False),
+    }
+
+    user_agent = payload.get("userAgent")
+    if user_agent:
+        data["userAgent"] = user_agent
+
+    spells = item.get("spells")
+    if spells:
+        data["spells"] = []
+        for spell in spells:
+            spell_name = spell["name"]
+            defindex, spell_id = get_spell_id(spell_name)
+            data["spells"].append({"defindex": defindex, "id": spell_id, "name": spell_name})
+
+    strange_parts = item.get("strangeParts")
+    if strange_parts:
+        data["strangeParts"] = [
+            {"id": part["killEater"].get("id", strange_part_ids.get(part["killEater"]["name"])), "name": part["killEater"]["name"]}
+            for part in strange_parts
+        ]
+
+    for source, field, ids in websocket_attributes:
+        value = item.get(source)
+        if value:
+            name = value["name"]
+            data[field] = {"id": value.get("id", ids.get(name)), "name": name}
+
+    return data
+
+
+def normalize_snapshot_listing(listing: dict) -> dict:
+    """
+    Turn a snapshot listing into a stored listing document.
+
+    Args:
+        listing (dict): Snapshot listing.
+
+    Returns:
+        dict: Listing document.
+    """
+    intent = listing["intent"]
+    steamID = listing["steamid"]
+    item = listing["item"]
+
+    data = {
+        "_id": item["id"] if intent == "sell" else f"buy_440_{steamID}",
+        "bumpAt": listing["bump"],
+        "buyoutOnly": bool(listing.get("buyout", False)),
+        "currencies": listing["currencies"],
+        "details": listing.get("details", ""),
+        "intent": intent,
+        "listedAt": listing["timestamp"],
+        "steamID": steamID,
+        "tradeOffersPreferred": bool(listing.get("offers", False)),
+    }
+
+    user_agent = listing.get("userAgent")
+    if user_agent:
+        data["userAgent"] = user_agent
+
+    for attribute in item.get("attributes") or ():
+        key = (attribute.get("defindex"), attribute.get("float_value"))
+        cached = snapshot_entries.get(key)
+        if cached is None:
+            if key[0] not in snapshot_attributes:
+                continue
+            cached = snapshot_entries[key] = get_snapshot_entry(*key)
+
+        field, entry, is_list = cached
+        if is_list:
+            data.setdefault(field, []).append(entry.copy())
+        else:
+            data[field] = entry.copy()
+
+    return data
+
+
+def normalize_listing(listing: dict, item_sku: str = None, item_name: str = None) -> dict:
+    """
+    Turn a WebSocket event payload or a snapshot listing into a stored listing document.
+
+    Args:
+        listing (dict): WebSocket event payload or snapshot listing.
+        item_sku (str): SKU of the item, stored on the document if given.
+        item_name (str): Name of the item, stored on the document if given.
+
+    Returns:
+        dict: Listing document, or None for Marketplace.tf listings.
+    """
+    # Skip Marketplace.tf listings
+    if "usd" in listing["currencies"]:
+        return
+
+    if "bumpedAt" in listing:
+        data = normalize_websocket_listing(listing)
+    else:
+        data = normalize_snapshot_listing(listing)
+
+    if item_name is not None:
+        data["name"] = item_name
+    if item_sku is not None:
+        data["sku"] = item_sku
+
+    return data
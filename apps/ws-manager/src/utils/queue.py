@@ -1,10 +1,42 @@
+from utils.config import QUEUE_MAX_SIZE, QUEUE_OVERFLOW, QUEUE_LOG_PATH, QUEUE_LOG_SEGMENT_SIZE
 from database.listings import ListingsDatabase
 from utils.logger import SyncLogger
 from collections import deque
-from utils.utils import tf2
+from utils.translation import translation
+from utils.event_log import EventLog
+import asyncio
 
 
-updates_queue = deque()
+# Updates are kept in one sub-queue per item name, in order of arrival of each item,
+# so that purging an item does not touch the updates of any other item.
+updates_queue = {}
+updates_available = asyncio.Event()
+space_available = asyncio.Event()
+queue_stats = {"size": 0, "dropped": 0, "purged": 0, "spilled": 0, "replayed": 0, "pending_spill": 0, "prioritized": 0}
+
+# Updates past the in-memory limit are written to an on-disk log. Updates read back from it are
+# tagged with the read they came from, and the log is committed up to a read once all of its
+# updates were written to the database.
+event_log = EventLog(QUEUE_LOG_PATH, QUEUE_LOG_SEGMENT_SIZE)
+log_reads = {}
+log_state = {"next_read": 0}
+
+# Decaying request counts of items on the listings service, by item name. Under backlog,
+# updates of the most requested items are taken first.
+demand_scores = {}
+
+
+def get_item_name(update: dict) -> str:
+    """
+    Get the item name of a listing update.
+
+    Args:
+        update (dict): Listing update record.
+
+    Returns:
+        str: Name of the item.
+    """
+    return update["name"]
 
 
 class ListingsQueueService:
@@ -15,6 +47,20 @@ class ListingsQueueService:
         """
         self.logger = SyncLogger("ListingsQueueService")
         self.db = ListingsDatabase()
+        self.max_size = QUEUE_MAX_SIZE
+        self.overflow = QUEUE_OVERFLOW
+
+        if self.overflow not in ("block", "drop_oldest", "spill"):
+            self.logger.write_log("error", f"Unknown queue overflow policy: {self.overflow}, falling back to block")
+            self.overflow = "block"
+
+        if self.overflow == "spill" and not event_log.opened:
+            pending = event_log.open()
+            if pending:
+                queue_stats["pending_spill"] = pending
+                queue_stats["replayed"] = pending
+                updates_available.set()
+                self.logger.write_log("info", f"Replaying {pending} updates from the event log")
 
 
     def count_updates(self) -> int:
@@ -24,28 +70,218 @@ class ListingsQueueService:
         Returns:
             int: Number of updates.
         """
-        return len(updates_queue)
+        return queue_stats["size"] + queue_stats["pending_spill"]
 
 
-    def get_updates(self) -> list:
+    async def get_updates(self) -> list:
         """
-        Get updates from the listing updates queue.
+        Get updates from the listing updates queue, waiting until at least one is available.
 
         Returns:
             list: List of items.
         """
-        return [updates_queue.popleft() for _ in range(min(len(updates_queue), 2000))]
+        while not queue_stats["size"] and not queue_stats["pending_spill"]:
+            updates_available.clear()
+            await updates_available.wait()
+
+        if queue_stats["size"] < self.max_size // 2 and queue_stats["pending_spill"]:
+            self.load_spilled_updates(self.max_size // 2)
+
+        batch = []
+        limit = 2000
+        if demand_scores and queue_stats["size"] > limit:
+            self.take_demanded_updates(batch, limit // 2)
+
+        while updates_queue and len(batch) < limit:
+            item_name = next(iter(updates_queue))
+            item_updates = updates_queue[item_name]
+            if len(item_updates) <= limit - len(batch):
+                batch.extend(item_updates)
+                del updates_queue[item_name]
+            else:
+                batch.extend(item_updates.popleft() for _ in range(limit - len(batch)))
+
+        queue_stats["size"] -= len(batch)
+        if queue_stats["size"] < self.max_size:
+            space_available.set()
+
+        return batch
+
+
+    def take_demanded_updates(self, batch: list, limit: int) -> None:
+        """
+        Move updates of the most requested items into a batch. Only part of the batch
+        is given to them, so other items keep being drained.
+
+        Args:
+            batch (list): Batch to add the updates to.
+            limit (int): Maximum number of updates to take.
+        """
+        demanded_items = sorted((name for name in demand_scores if name in updates_queue), key=demand_scores.get, reverse=True)
+        for item_name in demanded_items:
+            if len(batch) >= limit:
+                break
+            item_updates = updates_queue[item_name]
+            if len(item_updates) <= limit - len(batch):
+                batch.extend(item_updates)
+                del updates_queue[item_name]
+            else:
+                batch.extend(item_updates.popleft() for _ in range(limit - len(batch)))
+        queue_stats["prioritized"] += len(batch)
+
+
+    def add_demand(self, counts: dict) -> None:
+        """
+        Add listings service request counts to the demand scores, decaying older demand.
+
+        Args:
+            counts (dict): Number of requests since the last report, by item SKU.
+        """
+        for item_name in list(demand_scores):
+            demand_scores[item_name] /= 2
+            if demand_scores[item_name] < 0.5:
+                del demand_scores[item_name]
+
+        for item_sku, count in counts.items():
+            item_name = translation.get_name_from_sku(item_sku)
+            if item_name:
+                demand_scores[item_name] = demand_scores.get(item_name, 0) + count
+
+
+    def enqueue(self, items: list) -> None:
+        """
+        Append updates to their items' sub-queues.
+
+        Args:
+            items (list): List of items.
+        """
+        for item in items:
+            item_name = get_item_name(item)
+            if item_name not in updates_queue:
+                updates_queue[item_name] = deque()
+            updates_queue[item_name].append(item)
+        queue_stats["size"] += len(items)
+
+
+    def drop_oldest(self, count: int) -> None:
+        """
+        Drop the oldest updates from the queue.
+
+        Args:
+            count (int): Number of updates to drop.
+        """
+        dropped = 0
+        while updates_queue and dropped < count:
+            item_name = next(iter(updates_queue))
+            item_updates = updates_queue[item_name]
+            item_updates.popleft()
+            dropped += 1
+            if not item_updates:
+                del updates_queue[item_name]
+
+        queue_stats["size"] -= dropped
+        queue_stats["dropped"] += dropped
+
+
+    async def add_updates(self, items: list) -> None:
+        """
+        Add updates to the listing updates queue, applying the configured overflow policy when it is full.
+
+        Args:
+            items (list): List of items.
+        """
+        if self.overflow == "block":
+            while queue_stats["size"] >= self.max_size:
+                space_available.clear()
+                await space_available.wait()
+            self.enqueue(items)
+
+        elif self.overflow == "drop_oldest":
+            self.enqueue(items)
+            overflow = queue_stats["size"] - self.max_size
+            if overflow > 0:
+                self.drop_oldest(overflow)
+                self.logger.write_log("warning", f"Queue full, dropped {overflow} oldest updates")
+
+        else:
+            # Once anything is spilled, newer updates follow it to disk to keep the queue in order
+            if queue_stats["pending_spill"] or queue_stats["size"] + len(items) > self.max_size:
+                self.spill_updates(items)
+            else:
+                self.enqueue(items)
+
+        updates_available.set()
+
+
+    def spill_updates(self, items: list) -> None:
+        """
+        Append updates to the event log.
+
+        Args:
+            items (list): List of items.
+        """
+        event_log.append(items)
+        queue_stats["spilled"] += len(items)
+        queue_stats["pending_spill"] += len(items)
+
+
+    def load_spilled_updates(self, limit: int) -> None:
+        """
+        Move updates from the event log back into the in-memory queue.
+
+        Args:
+            limit (int): Maximum number of updates to load.
+        """
+        records, position = event_log.read(limit)
+
+        read_id = log_state["next_read"]
+        log_state["next_read"] += 1
+        loaded = []
+        for record_position, item in records:
+            # Skip updates logged before their item was purged
+            if record_position >= event_log.purges.get(get_item_name(item), (0, 0)):
+                item["log_read"] = read_id
+                loaded.append(item)
+        log_reads[read_id] = {"pending": len(loaded), "position": position}
+
+        self.enqueue(loaded)
+        queue_stats["pending_spill"] -= len(records)
+        if not records or queue_stats["pending_spill"] < 0:
+            # Records torn by a crash are counted on startup but never read
+            queue_stats["pending_spill"] = 0
+        self.commit_log()
 
 
-    def add_updates(self, items: list) -> None:
+    def complete_updates(self, items: list) -> None:
         """
-        ADd updates to the listing updates queue.
+        Mark updates as written to the database, so the event log can be committed past them.
 
         Args:
             items (list): List of items.
         """
-        global updates_queue
-        updates_queue.extend(items)
+        if not log_reads:
+            return
+
+        for item in items:
+            read_id = item.get("log_read")
+            if read_id is not None:
+                log_reads[read_id]["pending"] -= 1
+        self.commit_log()
+
+
+    def commit_log(self) -> None:
+        """
+        Commit the event log up to the last read whose updates, and those of every read before it, were all written.
+        """
+        position = None
+        while log_reads:
+            read_id = next(iter(log_reads))
+            if log_reads[read_id]["pending"] > 0:
+                break
+            position = log_reads.pop(read_id)["position"]
+
+        if position is not None:
+            event_log.commit(position)
 
 
     def remove_updates(self, item_sku: str) -> None:
@@ -55,7 +291,42 @@ class ListingsQueueService:
         Args:
             item_sku (str): SKU of the item.
         """
-        global updates_queue
-        item_name = tf2.get_name_from_sku(item_sku)
-        updates_queue = deque([item for item in updates_queue if item.get("payload").get("name") != item_name])
-        self.logger.write_log("info", f"Removed updates from queue: {item_name}")
+        item_name = translation.get_name_from_sku(item_sku)
+        item_updates = updates_queue.pop(item_name, None)
+        removed = len(item_updates) if item_updates else 0
+        queue_stats["size"] -= removed
+        queue_stats["purged"] += removed
+
+        if item_updates:
+            self.complete_updates(item_updates)
+        if queue_stats["pending_spill"]:
+            event_log.purges[item_name] = event_log.end_position()
+
+        if queue_stats["size"] < self.max_size:
+            space_available.set()
+
+        self.logger.write_log("info", f"Removed {removed} updates from queue: {item_name}")
+
+
+    def get_stats(self) -> dict:
+        """
+        Get queue statistics.
+
+        Returns:
+            dict: Queue size, capacity, overflow policy and dropped/purged/spilled counts.
+        """
+        return {
+            "size": self.count_updates(),
+            "in_memory": queue_stats["size"],
+            "items": len(updates_queue),
+            "max_size": self.max_size,
+            "overflow": self.overflow,
+            "dropped": queue_stats["dropped"],
+            "purged": queue_stats["purged"],
+            "spilled": queue_stats["spilled"],
+            "replayed": queue_stats["replayed"],
+            "prioritized": queue_stats["prioritized"],
+            "demanded_items": len(demand_scores),
+            "pending_spill": queue_stats["pending_spill"],
+            "log_segments": len(event_log.list_segments()) if event_log.opened else 0,
+        }
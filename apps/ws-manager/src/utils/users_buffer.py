@@ -0,0 +1,125 @@
+from utils.config import USER_FLUSH_INTERVAL, USER_FLUSH_SIZE, USER_HASH_TTL
+from database.users import UsersDatabase
+from utils.logger import SyncLogger
+from collections import OrderedDict
+import asyncio
+import orjson
+import time
+import zlib
+
+
+class UsersBuffer:
+
+    def __init__(self, max_hashes: int = 100000) -> None:
+        """
+        Initialize the UsersBuffer class.
+
+        Args:
+            max_hashes (int): Maximum number of users whose last written content is remembered (default is 100000).
+        """
+        self.logger = SyncLogger("UsersBuffer")
+        self.users_db = UsersDatabase()
+        self.flush_interval = USER_FLUSH_INTERVAL
+        self.flush_size = USER_FLUSH_SIZE
+        self.hash_ttl = USER_HASH_TTL
+        self.max_hashes = max_hashes
+
+        # Users waiting to be written, by steamid, and the content hash and write time of recently written users
+        self.pending = {}
+        self.written = OrderedDict()
+        self.flush_needed = asyncio.Event()
+        self.stats = {"received": 0, "unchanged": 0, "flushes": 0, "written": 0, "requeued": 0}
+
+
+    def get_hash(self, user: dict) -> int:
+        """
+        Get the content hash of a user.
+
+        Args:
+            user (dict): User data.
+
+        Returns:
+            int: Content hash.
+        """
+        return zlib.crc32(orjson.dumps(user, option=orjson.OPT_SORT_KEYS))
+
+
+    def add(self, user: dict) -> None:
+        """
+        Add a user to the buffer, unless the same content was written recently.
+
+        Args:
+            user (dict): User data.
+        """
+        self.stats["received"] += 1
+        steamid = user["id"]
+        user_hash = self.get_hash(user)
+
+        written = self.written.get(steamid)
+        if written and written[0] == user_hash and time.time() - written[1] < self.hash_ttl:
+            self.stats["unchanged"] += 1
+            return
+
+        self.pending[steamid] = (user, user_hash)
+        if len(self.pending) >= self.flush_size:
+            self.flush_needed.set()
+
+
+    async def flush(self) -> bool:
+        """
+        Write the buffered users to the database in a single batch.
+
+        Returns:
+            bool: False if the batch failed and went back into the buffer, True otherwise.
+        """
+        if not self.pending:
+            return True
+
+        pending, self.pending = self.pending, {}
+        users = [user for user, _ in pending.values()]
+        written = await self.users_db.bulk_upsert(users)
+        self.stats["flushes"] += 1
+        self.stats["written"] += written
+
+        # A failed batch goes back into the buffer for the next flush, unless newer data of a user arrived meanwhile
+        if written != len(users):
+            self.stats["requeued"] += len(users)
+            for steamid, entry in pending.items():
+                self.pending.setdefault(steamid, entry)
+            return False
+
+        now = time.time()
+        for steamid, (_, user_hash) in pending.items():
+            self.written[steamid] = (user_hash, now)
+            self.written.move_to_end(steamid)
+        while len(self.written) > self.max_hashes:
+            self.written.popitem(last=False)
+        return True
+
+
+    async def run(self) -> None:
+        """
+        Flush the buffer periodically, or as soon as it is full.
+        """
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self.flush_needed.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.flush_needed.clear()
+                if not await self.flush():
+                    # Wait a full interval before retrying a failed batch, even if the buffer is full
+                    await asyncio.sleep(self.flush_interval)
+            except Exception as e:
+                self.logger.write_log("error", f"Failed to flush users: {e}")
+
+
+    def get_stats(self) -> dict:
+        """
+        Get buffer statistics.
+
+        Returns:
+            dict: Pending and remembered users, and received, unchanged, written and requeued counts.
+        """
+        return {"pending": len(self.pending), "remembered": len(self.written), **self.stats}
@@ -1,15 +1,25 @@
 from database.listings import ListingsDatabase
+from database.summaries import SummariesDatabase
+from api.listings_manager import ListingsManager
 from utils.queue import ListingsQueueService
-from utils.utils import tf2, get_spell_id
-from database.users import UsersDatabase
-from utils.config import SAVE_USER_DATA
-from utils.cache import CacheService
+from ws.decoder import decode_frame, decode_frame_in_worker
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.translation import translation
+from utils.pricing import get_price
+from utils.users_buffer import UsersBuffer
+from utils.config import SAVE_USER_DATA, WORKER_COUNT, SHARD_QUEUE_SIZE, INGEST_PROCESSES, FRAME_PREFILTER, UPDATES_FEED_SIZE, GAP_ACTIVITY_WINDOW, SUMMARY_INTERVAL, WRITE_RETRIES, FAILED_WRITES_PATH
+from utils.cache import CacheService, cache_database
+from utils.feed import UpdatesFeed
 from utils.logger import SyncLogger
+from collections import deque
+import multiprocessing
 import websockets
 import asyncio
 import orjson
 import time
-import math
+import zlib
+import os
 
 
 class BackpackTFWebSocket:
@@ -21,14 +31,34 @@ class BackpackTFWebSocket:
         self.ws_url = 'wss://ws.backpack.tf/events'
         self.headers = {'appid': 440, 'batch-test': True}
         self.save_user_data = SAVE_USER_DATA
-        self.updated_items = []
-        
+        self.updates_feed = UpdatesFeed(UPDATES_FEED_SIZE)
+        self.worker_count = max(1, WORKER_COUNT)
+        self.shards = [asyncio.Queue(maxsize=SHARD_QUEUE_SIZE) for _ in range(self.worker_count)]
+        self.shard_stats = [{"upserted": 0, "modified": 0, "deleted": 0, "failed": 0, "retried": 0} for _ in range(self.worker_count)]
+        self.ingest_stats = {"frames": 0, "rejected_frames": 0, "received": 0, "accepted": 0, "failed": 0, "pool_restarts": 0}
+        self.prefilter = FRAME_PREFILTER
+
+        # Last time each item had an event, and the recent disconnects with the items refreshed after them
+        self.item_activity = {}
+        self.disconnected_at = None
+        self.gaps = deque(maxlen=100)
+        self.gap_tasks = set()
+
+        # Items whose order book summary is rebuilt on the next pass, so hot items are summarized once per interval
+        self.changed_summaries = set()
+        self.summary_stats = {"updated": 0, "last_pass": None}
+
+        # Optional process pool decoding frames off the event loop
+        self.pool = self.create_pool() if INGEST_PROCESSES > 0 else None
+        self.pending_frames = asyncio.Queue(maxsize=max(1, INGEST_PROCESSES) * 2)
 
         self.logger = SyncLogger("BackpackTFWebSocket")
         self.queue = ListingsQueueService()
         self.cache = CacheService()
         self.listings_db = ListingsDatabase()
-        self.users_db = UsersDatabase()
+        self.users_buffer = UsersBuffer()
+        self.listings_manager = ListingsManager()
+        self.summaries_db = SummariesDatabase()
 
 
     async def connect(self) -> None:
@@ -42,127 +72,366 @@ class BackpackTFWebSocket:
                     extra_headers=self.headers, 
                     max_size=None,
                     ping_interval=60,
-                    ping_timeout=120
+                    ping_timeout=120,
+                    max_queue=4
                     ):
-                    async for messages in websocket:
-                        messages = orjson.loads(messages)
-                        if isinstance(messages, list):
-                            self.queue.add_updates(messages)
-                            self.logger.write_log("info", f"Received {len(messages)} messages")
-                            
-                        sleep_time = math.ceil(self.queue.count_updates() / 2000)
-                        if sleep_time > 0:
-                            await asyncio.sleep(sleep_time)
+                    if self.disconnected_at:
+                        self.record_gap()
+
+                    # While add_updates waits for queue space, no further frames are read,
+                    # so websockets' own flow control pushes back on the server.
+                    async for frame in websocket:
+                        if self.pool:
+                            await self.pending_frames.put(asyncio.ensure_future(self.decode_in_pool(frame)))
+                        else:
+                            version, items = self.cache.get_snapshot()
+                            await self.enqueue_frame(decode_frame(frame, version, items, self.save_user_data, self.prefilter))
+
+                    self.disconnected_at = time.time()
             except websockets.exceptions.ConnectionClosedError:
                 self.logger.write_log("error", "Connection closed")
+                self.disconnected_at = self.disconnected_at or time.time()
                 await asyncio.sleep(1)
                 continue
             except Exception as e:
                 self.logger.write_log("error", f"Failed to connect: {e}")
+                self.disconnected_at = self.disconnected_at or time.time()
                 await asyncio.sleep(60)
                 continue
 
 
-    async def handle_messages(self) -> None:
+    def record_gap(self) -> None:
         """
-        Handle messages from the Backpack.tf WebSocket.
+        Record the disconnect that just ended and ask the listings manager to refresh
+        the items that were active before it, most recently active first, since their
+        events from the disconnect window were missed.
+        """
+        try:
+            reconnected_at = time.time()
+            _, items = self.cache.get_snapshot()
+            watched_skus = set(items.values())
+            active_since = self.disconnected_at - GAP_ACTIVITY_WINDOW
+
+            active_items = sorted(
+                ((last_event, item_sku) for item_sku, last_event in self.item_activity.items() if last_event >= active_since and item_sku in watched_skus),
+                reverse=True,
+            )
+            skus = [item_sku for _, item_sku in active_items]
+
+            self.gaps.append({"disconnected_at": self.disconnected_at, "reconnected_at": reconnected_at, "refreshed": len(skus)})
+            self.logger.write_log("warning", f"Reconnected after {reconnected_at - self.disconnected_at:.0f}s, requesting refresh of {len(skus)} items")
+            self.disconnected_at = None
+
+            if skus:
+                task = asyncio.create_task(self.listings_manager.refresh_items(skus))
+                self.gap_tasks.add(task)
+                task.add_done_callback(self.gap_tasks.discard)
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to record disconnect: {e}")
+
+
+    def create_pool(self) -> ProcessPoolExecutor:
+        """
+        Create the decoder process pool.
+
+        Workers are spawned rather than forked, as this process already runs the database
+        and schema client threads. They only import the decoder and its lookup tables,
+        and get the watched items with their first frame.
+
+        Returns:
+            ProcessPoolExecutor: Decoder process pool.
+        """
+        return ProcessPoolExecutor(max_workers=INGEST_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+
+
+    async def decode_in_pool(self, frame: bytes) -> tuple:
+        """
+        Decode a frame in the decoder process pool.
+
+        If a decoder process died, the pool is replaced and the frame is decoded in the event loop instead.
+
+        Args:
+            frame (bytes): Raw frame.
+
+        Returns:
+            tuple: List of records and decoding statistics of the frame.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        try:
+            version, items = self.cache.get_snapshot()
+            result = await loop.run_in_executor(pool, decode_frame_in_worker, frame, version, self.save_user_data, self.prefilter)
+            if result is None:
+                version, items = self.cache.get_snapshot()
+                result = await loop.run_in_executor(pool, decode_frame_in_worker, frame, version, self.save_user_data, self.prefilter, items)
+            return result
+        except BrokenProcessPool:
+            # Frames in flight on the broken pool all fail, and only the first of them replaces it
+            if self.pool is pool:
+                self.logger.write_log("error", "Decoder process pool broke, starting a new one")
+                self.ingest_stats["pool_restarts"] += 1
+                self.pool = self.create_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+
+            version, items = self.cache.get_snapshot()
+            return decode_frame(frame, version, items, self.save_user_data, self.prefilter)
+
+
+    async def collect_frames(self) -> None:
+        """
+        Add frames decoded by the process pool to the queue, in the order they were received.
         """
         while True:
+            task = await self.pending_frames.get()
             try:
-                await asyncio.sleep(1)
-                updates_in_queue = self.queue.count_updates()
-                if updates_in_queue > 0:
-                    batch = self.queue.get_updates()
-                    if not batch:
-                        continue
+                await self.enqueue_frame(await task)
+            except Exception as e:
+                self.logger.write_log("error", f"Failed to decode frame: {e}")
 
-                    self.logger.write_log("info", f"Processing {len(batch)} messages, left {updates_in_queue} messages")
-                    start_time = time.time()
-                    for message in batch:
-                        try:
-                            payload = message['payload']
 
-                            item = payload.get('item', {})
-                            if not item or not isinstance(item, dict):
-                                continue
+    async def enqueue_frame(self, result: tuple) -> None:
+        """
+        Add the records of a decoded frame to the queue.
 
-                            item_name = item['name']
-                            if not await self.cache.check_item_exists(item_name):
-                                continue
+        Args:
+            result (tuple): List of records and decoding statistics of the frame.
+        """
+        records, stats = result
+        self.ingest_stats["frames"] += 1
+        self.ingest_stats["accepted"] += len(records)
+        for key, value in stats.items():
+            self.ingest_stats[key] += value
 
-                            item_sku = self.cache.get_sku_from_name(item_name)
-                            if not item_sku:
-                                item_sku = tf2.get_sku_from_name(item_name)
+        if stats["failed"]:
+            self.logger.write_log("error", f"Failed to decode {stats['failed']} of {stats['received']} messages")
 
-                            currencies = payload['currencies']
-                            if "usd" in currencies:
-                                continue
+        if stats["rejected_frames"]:
+            return
+
+        now = time.time()
+        for record in records:
+            self.item_activity[record["sku"]] = now
+
+        if records:
+            await self.queue.add_updates(records)
+        self.logger.write_log("info", f"Received {stats['received']} messages, queued {len(records)}")
+
+
+    def coalesce_records(self, batch: list) -> list:
+        """
+        Reduce a batch to the last record for each listing, so that listings
+        updated or deleted several times within the batch are written once.
 
-                            intent = payload['intent']
-                            steamID = payload['steamid']
-                            listing_id = payload['id'] if intent == "sell" else f"buy_440_{steamID}"
+        Args:
+            batch (list): List of listing records.
+
+        Returns:
+            list: List of records, one per listing, in order of their last occurrence.
+        """
+        latest_records = {}
+        for record in batch:
+            key = (record["name"], record["id"])
+            latest_records.pop(key, None)
+            latest_records[key] = record
+
+        return list(latest_records.values())
+
+
+    async def handle_messages(self) -> None:
+        """
+        Handle messages from the Backpack.tf WebSocket.
+        """
+        while True:
+            try:
+                batch = await self.queue.get_updates()
+                if batch:
+                    updates_in_queue = self.queue.count_updates()
+
+                    start_time = time.time()
+                    records = self.coalesce_records(batch)
+                    self.logger.write_log("info", f"Processing {len(records)} of {len(batch)} messages after coalescing, left {updates_in_queue} messages")
 
-                            event = message['event']
-                            if event == "delete":
-                                await self.listings_db.delete(item_sku, listing_id)
-                                self.logger.write_log("info", f"Deleted listing ({listing_id}) for {item_name}")
+                    operations = {}
+                    for record in records:
+                        if record["data"]:
+                            # A listing with malformed currencies is skipped rather than failing the whole batch
+                            try:
+                                record["data"]["price"] = get_price(record["data"]["currencies"])
+                            except Exception as e:
+                                self.ingest_stats["failed"] += 1
+                                self.logger.write_log("error", f"Failed to price listing {record['id']} of {record['sku']}: {e}")
                                 continue
+                        operations.setdefault(record["sku"], []).append((record["id"], record["data"]))
 
-                            data = {
-                                "_id": listing_id,
-                                "bumpAt": payload["bumpedAt"],
-                                "buyoutOnly": payload.get("buyoutOnly", False),
-                                "currencies": currencies,
-                                "details": payload.get("details", ""),
-                                "intent": intent,
-                                "listedAt": payload["listedAt"],
-                                "name": item_name,
-                                "sku": item_sku,
-                                "steamID": steamID,
-                                "tradeOffersPreferred": payload.get("tradeOffersPreferred", False),
-                            }
-
-                            if payload.get("userAgent"):
-                                data["userAgent"] = payload["userAgent"]
-
-                            if item.get("spells"):
-                                spells = []
-                                for spell in item["spells"]:
-                                    spell_name = spell["name"]
-                                    defindex, id = get_spell_id(spell_name)
-                                    spells.append({"defindex": defindex, "id": id, "name": spell_name})
-                                data["spells"] = spells
-
-                            if item.get("paint"):
-                                data["paint"] = {"id": item["paint"]["id"], "name": item["paint"]["name"]}
-
-                            if item.get("strangeParts"):
-                                strange_parts = []
-                                for part in item["strangeParts"]:
-                                    strange_parts.append({"id": part["killEater"]["id"], "name": part["killEater"]["name"]})
-                                data["strangeParts"] = strange_parts
-
-                            if item.get("killstreaker"):
-                                data["killstreaker"] = {"id": item["killstreaker"]["id"], "name": item["killstreaker"]["name"]}
-
-                            if item.get("sheen"):
-                                data["sheen"] = {"id": item["sheen"]["id"], "name": item["sheen"]["name"]}
-
-                            await self.listings_db.update(item_sku, data)
-
-                            if item_sku not in [i["sku"] for i in self.updated_items]:
-                                self.updated_items.append({"sku": item_sku, "name": item_name})
-
-                            self.logger.write_log("info", f"Updated listing ({listing_id}) for {item_name}")
-
-                            if self.save_user_data and payload.get("user"):
-                                payload["user"]["_id"] = payload["user"]["id"]
-                                await self.users_db.insert(payload["user"])
-                        except Exception as e:
-                            self.logger.write_log("error", f"Failed to process message: {e}")
+                        if record.get("user"):
+                            self.users_buffer.add(record["user"])
+
+                    # Tracks the batch until every worker wrote its share, so logged updates are only committed once applied
+                    tracker = {"batch": batch, "pending": len(operations)}
+                    if not operations:
+                        self.queue.complete_updates(batch)
+                    for item_sku, item_operations in operations.items():
+                        await self.shards[self.get_shard(item_sku)].put((item_sku, item_operations, tracker))
 
                     time_taken = time.time() - start_time
-                    self.logger.write_log("info", f"Processed {len(batch)} messages in {time_taken:.2f}s (avg: {time_taken / len(batch):.4f}s/message)")
+                    self.logger.write_log("info", f"Dispatched {len(records)} messages for {len(operations)} items to {self.worker_count} workers in {time_taken:.2f}s")
             except Exception as e:
                 self.logger.write_log("error", f"Failed to handle messages: {e}")
                 continue
+
+
+    def get_shard(self, item_sku: str) -> int:
+        """
+        Get the shard that owns an item, so all of its events are written by the same worker.
+
+        Args:
+            item_sku (str): SKU of the item.
+
+        Returns:
+            int: Index of the shard.
+        """
+        return zlib.crc32(item_sku.encode()) % self.worker_count
+
+
+    async def write_operations(self, shard_id: int, item_sku: str, item_operations: list) -> bool:
+        """
+        Write an item's listing operations, retrying with backoff while the write fails.
+
+        The operations are the last state of each listing, so writing them again is safe.
+
+        Args:
+            shard_id (int): Index of the shard owned by the worker.
+            item_sku (str): SKU of the item.
+            item_operations (list): List of (listing_id, listing) tuples, where listing is None for deletions.
+
+        Returns:
+            bool: True if every operation was written, False otherwise.
+        """
+        stats = self.shard_stats[shard_id]
+        for attempt in range(WRITE_RETRIES + 1):
+            if attempt:
+                stats["retried"] += 1
+                await asyncio.sleep(min(2 ** (attempt - 1), 30))
+
+            result = await self.listings_db.bulk_write(item_sku, item_operations)
+            for key in ("upserted", "modified", "deleted"):
+                stats[key] += result[key]
+            if not result["failed"]:
+                return True
+
+        stats["failed"] += result["failed"]
+        return False
+
+
+    def record_failed_write(self, item_sku: str, item_operations: list) -> None:
+        """
+        Append listing operations that could not be written to the failed writes file,
+        so they can be inspected or applied again by hand.
+
+        Args:
+            item_sku (str): SKU of the item.
+            item_operations (list): List of (listing_id, listing) tuples, where listing is None for deletions.
+        """
+        try:
+            os.makedirs(os.path.dirname(FAILED_WRITES_PATH) or ".", exist_ok=True)
+            with open(FAILED_WRITES_PATH, "ab") as file:
+                file.write(orjson.dumps({"sku": item_sku, "operations": item_operations, "failedAt": time.time()}) + b"\n")
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to record failed write for {item_sku}: {e}")
+
+
+    async def run_worker(self, shard_id: int) -> None:
+        """
+        Write the listing operations of one shard to the database, in order.
+
+        Operations that still fail after all retries are given up on and recorded in the
+        failed writes file, so the event log is not held back by a single item.
+
+        Args:
+            shard_id (int): Index of the shard owned by the worker.
+        """
+        shard = self.shards[shard_id]
+        while True:
+            item_sku, item_operations, tracker = await shard.get()
+            written = False
+            try:
+                written = await self.write_operations(shard_id, item_sku, item_operations)
+                if written:
+                    self.changed_summaries.add(item_sku)
+
+                    # Deletions carry no item name, so it is taken from the watched items
+                    item_name = next((data["name"] for _, data in item_operations if data), None) or cache_database["skus"].get(item_sku)
+                    if item_name:
+                        self.updates_feed.publish(item_sku, item_name)
+            except Exception as e:
+                self.logger.write_log("error", f"Worker {shard_id} failed to write listings for {item_sku}: {e}")
+            finally:
+                if not written:
+                    self.logger.write_log("error", f"Worker {shard_id} gave up writing {len(item_operations)} listings for {item_sku}, recorded them in {FAILED_WRITES_PATH}")
+                    self.record_failed_write(item_sku, item_operations)
+                self.complete_operations(tracker)
+                shard.task_done()
+
+
+    def complete_operations(self, tracker: dict) -> None:
+        """
+        Record that a worker finished its operations of a batch, completing the batch once all workers did.
+
+        Args:
+            tracker (dict): The batch and the number of items in it not written yet.
+        """
+        try:
+            tracker["pending"] -= 1
+            if not tracker["pending"]:
+                self.queue.complete_updates(tracker["batch"])
+        except Exception as e:
+            self.logger.write_log("error", f"Failed to complete batch: {e}")
+
+
+    async def run_workers(self) -> None:
+        """
+        Run the database writer workers.
+        """
+        self.logger.write_log("info", f"Starting {self.worker_count} database writer workers")
+        await asyncio.gather(*(self.run_worker(shard_id) for shard_id in range(self.worker_count)))
+
+
+    async def update_summaries(self) -> None:
+        """
+        Rebuild the order book summaries of the items written since the last pass.
+        """
+        while True:
+            try:
+                await asyncio.sleep(SUMMARY_INTERVAL)
+                skus, self.changed_summaries = self.changed_summaries, set()
+                for sku in skus:
+                    await self.summaries_db.update(sku)
+
+                self.summary_stats["updated"] += len(skus)
+                self.summary_stats["last_pass"] = time.time()
+            except Exception as e:
+                self.logger.write_log("error", f"Failed to update summaries: {e}")
+
+
+    def get_stats(self) -> dict:
+        """
+        Get ingest statistics.
+
+        Returns:
+            dict: Queue statistics, worker count and per-shard queue depth and write counts.
+        """
+        return {
+            "ingest": {"processes": INGEST_PROCESSES, "pending_frames": self.pending_frames.qsize(), **self.ingest_stats},
+            "queue": self.queue.get_stats(),
+            "cache": self.cache.get_stats(),
+            "translation": translation.get_stats(),
+            "feed": self.updates_feed.get_stats(),
+            "gaps": list(self.gaps),
+            "users": self.users_buffer.get_stats(),
+            "summaries": {"pending": len(self.changed_summaries), **self.summary_stats},
+            "workers": self.worker_count,
+            "shards": [
+                {"shard": shard_id, "queue_depth": shard.qsize(), **self.shard_stats[shard_id]}
+                for shard_id, shard in enumerate(self.shards)
+            ],
+        }
@@ -0,0 +1,166 @@
+from utils.normalization import normalize_listing
+import orjson
+import re
+
+
+# Watched items of a decoder process, tagged with the cache version they were taken from.
+worker_state = {"version": None, "items": {}}
+# Encoded names of the watched items and their escape prefixes, rebuilt when the cache version changes.
+name_index = {"version": None, "names": set()}
+# Moving average of the share of frames rejected by the pre-filter.
+prefilter_state = {"reject_rate": 1.0, "frames": 0}
+
+# Captures a name value up to its closing quote or its first escape sequence.
+name_pattern = re.compile(rb'"name"\s*:\s*"([^"\\]*)')
+
+
+def get_watched_names(version: int, watched_items: dict) -> set:
+    """
+    Get the UTF-8 encoded names of the watched items, together with every prefix of
+    each name that ends before a character a JSON encoder may escape. A watched name
+    therefore always matches name_pattern, however the server escapes it.
+
+    Args:
+        version (int): Version of the watched items cache.
+        watched_items (dict): Watched items, by name.
+
+    Returns:
+        set: Encoded item names and escape prefixes.
+    """
+    if name_index["version"] != version:
+        names = set()
+        for item_name in watched_items:
+            names.add(item_name.encode())
+            for index, char in enumerate(item_name):
+                if char in '"\\/' or ord(char) < 0x20 or ord(char) > 0x7e:
+                    names.add(item_name[:index].encode())
+        name_index["names"] = names
+        name_index["version"] = version
+    return name_index["names"]
+
+
+def should_prefilter() -> bool:
+    """
+    Check whether the next frame should be pre-filtered. When nearly every frame
+    holds a watched item the scan only adds cost, so it is then run on a sample
+    of frames to notice when that changes.
+
+    Returns:
+        bool: True if the frame should be pre-filtered, False otherwise.
+    """
+    prefilter_state["frames"] += 1
+    return prefilter_state["reject_rate"] >= 0.1 or prefilter_state["frames"] % 20 == 0
+
+
+def prefilter_frame(raw: bytes, watched_names: set) -> bool:
+    """
+    Check, without decoding it, whether a frame may hold events for watched items.
+
+    Args:
+        raw (bytes): Raw frame.
+        watched_names (set): Encoded names and escape prefixes of the watched items.
+
+    Returns:
+        bool: True if the frame may hold events for watched items, False if it can be skipped.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode()
+
+    names = name_pattern.findall(raw)
+    # A frame without any recognisable name is in an unexpected format, so it is decoded in full
+    accepted = not names or not watched_names.isdisjoint(names)
+    prefilter_state["reject_rate"] = prefilter_state["reject_rate"] * 0.9 + (0.0 if accepted else 0.1)
+    return accepted
+
+
+def decode_frame(raw: bytes, version: int, watched_items: dict, save_user_data: bool, prefilter: bool = True) -> tuple:
+    """
+    Decode a Backpack.tf WebSocket frame into listing records for watched items.
+
+    Each record holds the item name and SKU, the listing ID, the listing document
+    (None for deletions) and, when user data is saved, the listing's user.
+
+    Args:
+        raw (bytes): Raw frame.
+        version (int): Version of the watched items cache.
+        watched_items (dict): Watched items, by name.
+        save_user_data (bool): Whether to keep the user of each listing.
+        prefilter (bool): Whether to skip frames without watched items before decoding them (default is True).
+
+    Returns:
+        tuple: List of records and a dict with the number of decoded and failed events
+            and whether the frame was rejected by the pre-filter.
+    """
+    stats = {"received": 0, "rejected_frames": 0, "failed": 0}
+
+    if prefilter and should_prefilter() and not prefilter_frame(raw, get_watched_names(version, watched_items)):
+        stats["rejected_frames"] = 1
+        return [], stats
+
+    messages = orjson.loads(raw)
+    if not isinstance(messages, list):
+        return [], stats
+    stats["received"] = len(messages)
+
+    records = []
+    for message in messages:
+        try:
+            payload = message["payload"]
+
+            item = payload.get("item", {})
+            if not item or not isinstance(item, dict):
+                continue
+
+            item_name = item["name"]
+            item_sku = watched_items.get(item_name)
+            if not item_sku:
+                continue
+
+            if message["event"] == "delete":
+                if "usd" in payload["currencies"]:
+                    continue
+                listing_id = payload["id"] if payload["intent"] == "sell" else f"buy_440_{payload['steamid']}"
+                records.append({"name": item_name, "sku": item_sku, "id": listing_id, "data": None})
+                continue
+
+            data = normalize_listing(payload, item_sku, item_name)
+            if not data:
+                continue
+
+            record = {"name": item_name, "sku": item_sku, "id": data["_id"], "data": data}
+            if save_user_data and payload.get("user"):
+                user = payload["user"]
+                user["_id"] = user["id"]
+                record["user"] = user
+            records.append(record)
+        except Exception:
+            stats["failed"] += 1
+
+    return records, stats
+
+
+def decode_frame_in_worker(raw: bytes, version: int, save_user_data: bool, prefilter: bool, watched_items: dict = None) -> tuple:
+    """
+    Decode a frame in a decoder process.
+
+    The watched items are only sent when the process does not have the current
+    version yet, so most frames cross the process boundary as raw bytes only.
+
+    Args:
+        raw (bytes): Raw frame.
+        version (int): Version of the watched items cache.
+        save_user_data (bool): Whether to keep the user of each listing.
+        prefilter (bool): Whether to skip frames without watched items before decoding them.
+        watched_items (dict): Watched items, by name, if the process needs them.
+
+    Returns:
+        tuple: The result of decode_frame, or None if the process needs the current watched items.
+    """
+    if watched_items is not None:
+        worker_state["version"] = version
+        worker_state["items"] = watched_items
+
+    if worker_state["version"] != version:
+        return None
+
+    return decode_frame(raw, version, worker_state["items"], save_user_data, prefilter)
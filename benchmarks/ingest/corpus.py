@@ -0,0 +1,128 @@
+import argparse
+import random
+import orjson
+
+
+# Event name the websocket manager handles as a listing deletion.
+DELETE_EVENT = "delete"
+UPDATE_EVENT = "listing-update"
+
+SPELLS = ["Die Job", "Chromatic Corruption", "Team Spirit Footprints", "Voices From Below", "Pumpkin Bombs"]
+PAINTS = [(1315860, "A Distinctive Lack of Hue"), (2960676, "After Eight"), (3100495, "A Color Similar to Slate")]
+STRANGE_PARTS = [(10, "Scouts Killed"), (11, "Snipers Killed"), (12, "Soldiers Killed"), (13, "Demomen Killed")]
+SHEENS = [(1, "Team Shine"), (2, "Deadly Daffodil"), (3, "Manndarin")]
+KILLSTREAKERS = [(2002, "Fire Horns"), (2003, "Cerebral Discharge"), (2004, "Tornado")]
+
+
+def get_items(item_count: int) -> dict:
+    """
+    Get the synthetic items of the corpus.
+
+    Args:
+        item_count (int): Number of items.
+
+    Returns:
+        dict: Item SKUs, by item name.
+    """
+    return {f"Benchmark Item {index}": f"{90000 + index};6" for index in range(item_count)}
+
+
+def generate_event(rng: random.Random, item_name: str, steamids: list, delete_share: float) -> dict:
+    """
+    Generate a websocket event for an item.
+
+    Args:
+        rng (random.Random): Random number generator.
+        item_name (str): Name of the item.
+        steamids (list): SteamIDs of the synthetic traders.
+        delete_share (float): Share of events that are deletions.
+
+    Returns:
+        dict: Websocket event.
+    """
+    steamid = rng.choice(steamids)
+    intent = rng.choice(("sell", "buy"))
+    timestamp = 1700000000 + rng.randint(0, 10 ** 6)
+
+    item = {"name": item_name}
+    if rng.random() < 0.2:
+        item["spells"] = [{"name": name} for name in rng.sample(SPELLS, rng.randint(1, 2))]
+    if rng.random() < 0.2:
+        paint_id, paint_name = rng.choice(PAINTS)
+        item["paint"] = {"id": paint_id, "name": paint_name}
+    if rng.random() < 0.2:
+        item["strangeParts"] = [{"killEater": {"id": part_id, "name": part_name}} for part_id, part_name in rng.sample(STRANGE_PARTS, rng.randint(1, 3))]
+    if rng.random() < 0.1:
+        sheen_id, sheen_name = rng.choice(SHEENS)
+        effect_id, effect_name = rng.choice(KILLSTREAKERS)
+        item["sheen"] = {"id": sheen_id, "name": sheen_name}
+        item["killstreaker"] = {"id": effect_id, "name": effect_name}
+
+    payload = {
+        "id": f"440_{rng.randint(10 ** 9, 10 ** 10)}",
+        "steamid": steamid,
+        "appid": 440,
+        "intent": intent,
+        "currencies": {"keys": rng.randint(0, 5), "metal": round(rng.random() * 60, 2)},
+        "bumpedAt": timestamp,
+        "listedAt": timestamp - rng.randint(0, 10 ** 5),
+        "details": "",
+        "buyoutOnly": rng.random() < 0.5,
+        "tradeOffersPreferred": rng.random() < 0.5,
+        "item": item,
+        "user": {"id": steamid, "name": f"Trader {steamid[-4:]}", "premium": rng.random() < 0.1},
+    }
+    event = DELETE_EVENT if rng.random() < delete_share else UPDATE_EVENT
+    return {"id": f"{rng.getrandbits(64):016x}", "event": event, "payload": payload}
+
+
+def generate_frames(frame_count: int, frame_size: int, item_count: int, trader_count: int = 500, delete_share: float = 0.1, seed: int = 440) -> list:
+    """
+    Generate a synthetic corpus of websocket frames.
+
+    Item popularity follows a Zipf-like distribution, and a small set of traders
+    posts most listings, as on the live feed.
+
+    Args:
+        frame_count (int): Number of frames.
+        frame_size (int): Number of events per frame.
+        item_count (int): Number of distinct items.
+        trader_count (int): Number of distinct traders (default is 500).
+        delete_share (float): Share of events that are deletions (default is 0.1).
+        seed (int): Random seed (default is 440).
+
+    Returns:
+        list: Frames, each a list of events.
+    """
+    rng = random.Random(seed)
+    item_names = list(get_items(item_count))
+    weights = [1 / (rank + 1) for rank in range(item_count)]
+    steamids = [str(76561198000000000 + rng.randint(0, 10 ** 8)) for _ in range(trader_count)]
+
+    frames = []
+    for _ in range(frame_count):
+        names = rng.choices(item_names, weights=weights, k=frame_size)
+        frames.append([generate_event(rng, name, steamids, delete_share) for name in names])
+    return frames
+
+
+def main() -> None:
+    """
+    Write a synthetic corpus to a file, one frame per line.
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic backpack.tf websocket corpus.")
+    parser.add_argument("--frames", type=int, default=200, help="Number of frames")
+    parser.add_argument("--frame-size", type=int, default=500, help="Number of events per frame")
+    parser.add_argument("--items", type=int, default=2000, help="Number of distinct items")
+    parser.add_argument("--output", default="corpus.jsonl", help="Output file")
+    args = parser.parse_args()
+
+    frames = generate_frames(args.frames, args.frame_size, args.items)
+    with open(args.output, "wb") as file:
+        for frame in frames:
+            file.write(orjson.dumps(frame) + b"\n")
+    print(f"Wrote {len(frames)} frames of {args.frame_size} events to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
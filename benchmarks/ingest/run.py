@@ -0,0 +1,231 @@
+from server import load_frames, run_server
+from corpus import generate_frames, get_items
+import multiprocessing
+import statistics
+import argparse
+import tempfile
+import asyncio
+import socket
+import time
+import sys
+import os
+
+
+APP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "apps", "ws-manager", "src"))
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the ws-manager ingest path against a local MongoDB.")
+    parser.add_argument("--corpus", help="Corpus file written by corpus.py (default is a generated corpus)")
+    parser.add_argument("--items", type=int, default=2000, help="Number of distinct items in the corpus")
+    parser.add_argument("--frame-size", type=int, default=500, help="Number of events per frame in a generated corpus")
+    parser.add_argument("--rate", type=float, default=2000, help="Events per second sent by the fake websocket")
+    parser.add_argument("--duration", type=float, default=60, help="Duration of the run in seconds")
+    parser.add_argument("--database-url", default="mongodb://localhost:27017/", help="MongoDB to write to")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the fake websocket")
+    parser.add_argument("--workers", type=int, default=8, help="WORKER_COUNT of the websocket manager")
+    parser.add_argument("--processes", type=int, default=0, help="INGEST_PROCESSES of the websocket manager")
+    parser.add_argument("--save-user-data", action="store_true", help="Also write the users of listings")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the benchmark collections afterwards")
+    return parser.parse_args()
+
+
+def wait_for_port(port: int, timeout: float = 10) -> None:
+    """
+    Wait until the fake websocket accepts connections.
+
+    Args:
+        port (int): Port of the fake websocket.
+        timeout (float): Seconds to wait (default is 10).
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake websocket did not start on port {port}")
+
+
+def percentile(values: list, share: float) -> float:
+    """
+    Get a percentile of a list of values.
+
+    Args:
+        values (list): Values.
+        share (float): Percentile, between 0 and 1.
+
+    Returns:
+        float: Value at the percentile, or 0 if there are no values.
+    """
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+async def run_benchmark(args: argparse.Namespace, items: dict, steamids: list) -> dict:
+    """
+    Run the websocket manager against the fake websocket and measure it.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments.
+        items (dict): Item SKUs of the corpus, by item name.
+        steamids (list): SteamIDs of the traders in the corpus.
+
+    Returns:
+        dict: Throughput, latency and queue depth measurements.
+    """
+    from ws.backpack_tf import BackpackTFWebSocket
+    from utils.cache import cache_database
+
+    cache_database["items"] = dict(items)
+    cache_database["skus"] = {sku: name for name, sku in items.items()}
+    cache_database["version"] += 1
+
+    bptf_ws = BackpackTFWebSocket()
+    bptf_ws.ws_url = f"ws://127.0.0.1:{args.port}"
+
+    # Measure the time from sending each listing to its database write completing
+    latencies = []
+    written = {"operations": 0}
+    bulk_write = bptf_ws.listings_db.bulk_write
+
+    async def timed_bulk_write(sku: str, operations: list) -> dict:
+        result = await bulk_write(sku, operations)
+        now = time.time()
+        written["operations"] += len(operations)
+        for _, data in operations:
+            if data and data["details"].startswith("bench:"):
+                latencies.append(now - float(data["details"][6:]))
+        return result
+
+    bptf_ws.listings_db.bulk_write = timed_bulk_write
+
+    samples = []
+
+    async def sample() -> None:
+        while True:
+            await asyncio.sleep(1)
+            samples.append({
+                "received": bptf_ws.ingest_stats["received"],
+                "written": written["operations"],
+                "queue": bptf_ws.queue.count_updates(),
+                "shards": sum(shard.qsize() for shard in bptf_ws.shards),
+            })
+
+    tasks = [
+        asyncio.create_task(coroutine) for coroutine in (
+            bptf_ws.connect(),
+            bptf_ws.handle_messages(),
+            bptf_ws.run_workers(),
+            bptf_ws.collect_frames(),
+            bptf_ws.users_buffer.run(),
+            sample(),
+        )
+    ]
+    started_at = time.time()
+    await asyncio.sleep(args.duration)
+    elapsed = time.time() - started_at
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if bptf_ws.pool:
+        bptf_ws.pool.shutdown(cancel_futures=True)
+
+    if not args.keep_data:
+        listings_db = bptf_ws.listings_db
+        if listings_db.unified:
+            await listings_db.listings.delete_many({"sku": {"$in": list(items.values())}})
+        else:
+            for sku in items.values():
+                await listings_db.db.drop_collection(sku)
+        if args.save_user_data:
+            await bptf_ws.users_buffer.users_db.collection.delete_many({"_id": {"$in": steamids}})
+
+    return {
+        "elapsed": elapsed,
+        "received": bptf_ws.ingest_stats["received"],
+        "accepted": bptf_ws.ingest_stats["accepted"],
+        "written": written["operations"],
+        "latencies": latencies,
+        "samples": samples,
+    }
+
+
+def print_report(result: dict, args: argparse.Namespace) -> None:
+    """
+    Print the benchmark report.
+
+    Args:
+        result (dict): Throughput, latency and queue depth measurements.
+        args (argparse.Namespace): Parsed arguments.
+    """
+    elapsed = result["elapsed"]
+    latencies = result["latencies"]
+    depths = [sample["queue"] + sample["shards"] for sample in result["samples"]]
+
+    print()
+    print(f"Offered rate:      {args.rate:,.0f} events/s for {elapsed:.0f}s")
+    print(f"Received:          {result['received'] / elapsed:,.0f} events/s ({result['received'] / elapsed * 60:,.0f} events/min)")
+    print(f"Accepted:          {result['accepted'] / elapsed:,.0f} events/s")
+    print(f"Written:           {result['written'] / elapsed:,.0f} operations/s after coalescing")
+    print(f"Latency p50:       {percentile(latencies, 0.5) * 1000:,.0f} ms")
+    print(f"Latency p99:       {percentile(latencies, 0.99) * 1000:,.0f} ms")
+    if latencies:
+        print(f"Latency mean:      {statistics.mean(latencies) * 1000:,.0f} ms over {len(latencies):,} listings")
+    if depths:
+        print(f"Queue depth:       max {max(depths):,}, final {depths[-1]:,}")
+
+    print()
+    print(f"{'second':>6} {'received/s':>11} {'written/s':>10} {'queue':>8} {'shards':>7}")
+    previous = {"received": 0, "written": 0}
+    for second, sample in enumerate(result["samples"], start=1):
+        print(f"{second:>6} {sample['received'] - previous['received']:>11,} {sample['written'] - previous['written']:>10,} {sample['queue']:>8,} {sample['shards']:>7,}")
+        previous = sample
+
+
+def main() -> None:
+    """
+    Run the ingest benchmark.
+    """
+    args = parse_args()
+    frames = load_frames(args.corpus) if args.corpus else generate_frames(200, args.frame_size, args.items)
+    names = {event["payload"]["item"]["name"] for frame in frames for event in frame}
+    items = {name: sku for name, sku in get_items(args.items).items() if name in names}
+    steamids = list({event["payload"]["steamid"] for frame in frames for event in frame})
+
+    server = multiprocessing.Process(target=run_server, args=(frames, "127.0.0.1", args.port, args.rate), daemon=True)
+    server.start()
+    wait_for_port(args.port)
+
+    # The websocket manager reads its settings at import and writes its logs and event log next to the working directory
+    work_path = tempfile.mkdtemp(prefix="ingest-benchmark-")
+    os.makedirs(os.path.join(work_path, "src"))
+    os.chdir(os.path.join(work_path, "src"))
+    os.environ.update({
+        "DATABASE_URL": args.database_url,
+        "WORKER_COUNT": str(args.workers),
+        "INGEST_PROCESSES": str(args.processes),
+        "SAVE_USER_DATA": str(args.save_user_data).lower(),
+    })
+    sys.path.insert(0, APP_PATH)
+
+    try:
+        result = asyncio.run(run_benchmark(args, items, steamids))
+    finally:
+        server.terminate()
+
+    print_report(result, args)
+    print(f"\nLogs: {os.path.join(work_path, 'logs')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from corpus import generate_frames
+import websockets
+import argparse
+import asyncio
+import orjson
+import time
+
+
+def load_frames(path: str) -> list:
+    """
+    Load a corpus written by corpus.py.
+
+    Args:
+        path (str): Corpus file.
+
+    Returns:
+        list: Frames, each a list of events.
+    """
+    with open(path, "rb") as file:
+        return [orjson.loads(line) for line in file if line.strip()]
+
+
+async def replay(websocket, frames: list, rate: float, stats: dict) -> None:
+    """
+    Replay the corpus on a connection at a fixed event rate, looping over it.
+
+    Each listing's details carry its send time, so the harness can measure the
+    time until the listing is written to the database.
+
+    Args:
+        websocket: Client connection.
+        frames (list): Frames, each a list of events.
+        rate (float): Events per second.
+        stats (dict): Counters of sent frames and events.
+    """
+    next_send = time.perf_counter()
+    index = 0
+    while True:
+        frame = frames[index % len(frames)]
+        index += 1
+
+        sent_at = time.time()
+        for event in frame:
+            event["payload"]["details"] = f"bench:{sent_at}"
+        await websocket.send(orjson.dumps(frame))
+        stats["frames"] += 1
+        stats["events"] += len(frame)
+
+        # Sends block while the client applies backpressure, so the achieved rate is the sustained rate
+        next_send += len(frame) / rate
+        await asyncio.sleep(max(0, next_send - time.perf_counter()))
+        next_send = max(next_send, time.perf_counter() - 1)
+
+
+def run_server(frames: list, host: str, port: int, rate: float, stats: dict = None) -> None:
+    """
+    Run the fake backpack.tf websocket server until the process is stopped.
+
+    Args:
+        frames (list): Frames, each a list of events.
+        host (str): Host to listen on.
+        port (int): Port to listen on.
+        rate (float): Events per second for each connection.
+        stats (dict): Counters of sent frames and events (default is a new dict).
+    """
+    stats = stats if stats is not None else {"frames": 0, "events": 0}
+
+    async def handler(websocket, *args) -> None:
+        try:
+            await replay(websocket, frames, rate, stats)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def serve() -> None:
+        async with websockets.serve(handler, host, port, max_size=None):
+            await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+def main() -> None:
+    """
+    Run the fake backpack.tf websocket server from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Replay a backpack.tf websocket corpus.")
+    parser.add_argument("--corpus", help="Corpus file written by corpus.py (default is a generated corpus)")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--rate", type=float, default=1000, help="Events per second")
+    args = parser.parse_args()
+
+    frames = load_frames(args.corpus) if args.corpus else generate_frames(200, 500, 2000)
+    print(f"Replaying {len(frames)} frames at {args.rate:.0f} events/s on ws://{args.host}:{args.port}")
+    run_server(frames, args.host, args.port, args.rate)
+
+
+if __name__ == "__main__":
+    main()